@@ -0,0 +1,233 @@
+"""Admission control: bounded concurrency per request class, with load shedding.
+
+Reads and writes each get a budget of requests allowed to run at once; by default
+the two add up to the connection pool, so excess requests queue here for at most
+ADMISSION_QUEUE_TIMEOUT seconds instead of inside `get_db` for the 30s pool timeout. When a class's wait queue is full, or a queued request times out, the
+client gets an immediate 503 with `Retry-After`. Endpoints that never touch the
+database are exempt. Routes with long request bodies take their slot themselves,
+once the body is in (see `admitted`), so a slow upload holds no write slot.
+"""
+import asyncio
+import contextlib
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from .database import POOL_OPTIONS
+from .replicas import SAFE_METHODS
+from .telemetry import WAIT_BUCKETS, Histogram, format_labels, histogram_lines, metric_header
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+_POOL_CAPACITY = POOL_OPTIONS["pool_size"] + POOL_OPTIONS["max_overflow"]
+# Requests running at once per class. Both classes check out primary connections (reads
+# fall back to it without replicas), so by default they split the pool between them:
+# writes get the steady pool, leaving at least one connection, and reads get the rest.
+ADMISSION_WRITE_LIMIT = int(
+    os.getenv("ADMISSION_WRITE_LIMIT", str(max(1, min(POOL_OPTIONS["pool_size"], _POOL_CAPACITY - 1))))
+)
+ADMISSION_READ_LIMIT = int(
+    os.getenv("ADMISSION_READ_LIMIT", str(max(1, _POOL_CAPACITY - ADMISSION_WRITE_LIMIT)))
+)
+# Requests allowed to wait for a slot per class; beyond that they are rejected at once.
+ADMISSION_READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", str(2 * ADMISSION_READ_LIMIT)))
+ADMISSION_WRITE_QUEUE = int(os.getenv("ADMISSION_WRITE_QUEUE", str(2 * ADMISSION_WRITE_LIMIT)))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_RETRY_AFTER = float(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# Exact paths served without the database (`/metrics/tasks` queries it, so it is metered).
+EXEMPT_PATHS = frozenset(
+    {
+        "/metrics",
+        "/metrics/pool",
+        "/metrics/admission",
+        "/metrics/cache",
+        "/docs",
+        "/docs/oauth2-redirect",
+        "/redoc",
+        "/openapi.json",
+    }
+)
+# Routes that read their body before any database work and call `admitted` themselves.
+SELF_ADMITTED_PATHS = frozenset({"/import"})
+# POST endpoints that only read.
+READ_SUFFIXES = ("/batch-get",)
+OVERLOADED_DETAIL = "Server is overloaded, retry later"
+
+BUDGETS: Dict[str, "Budget"] = {}
+
+
+class Budget:
+    """At most `limit` holders and `queue_size` waiters; waiters are served in arrival order.
+
+    Not thread-safe: it lives on the server's event loop, as the middleware does.
+    """
+
+    def __init__(
+        self, name: str, limit: int, queue_size: int, timeout: float = ADMISSION_QUEUE_TIMEOUT
+    ):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.queue_wait = Histogram(WAIT_BUCKETS)
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._counters = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(not waiter.done() for waiter in self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in line if needed; False when the request should be shed."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._counters["admitted"] += 1
+            return True
+        if self.queue_depth >= self.queue_size:
+            self._counters["rejected_queue_full"] += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._counters["queued"] += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            self._counters["rejected_timeout"] += 1
+            return False
+        except asyncio.CancelledError:  # client went away; hand back a slot granted meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            self.queue_wait.observe(time.perf_counter() - start)
+            if not waiter.done() or waiter.cancelled():
+                self._discard(waiter)
+        self._counters["admitted"] += 1
+        return True
+
+    def release(self) -> None:
+        """Pass the slot to the next live waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "in_flight": self.active,
+            "queue_depth": self.queue_depth,
+            **self._counters,
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+def request_class(scope) -> str:
+    if scope["method"] in SAFE_METHODS or scope["path"].endswith(READ_SUFFIXES):
+        return "read"
+    return "write"
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI; sits inside CORS so shed responses still carry CORS headers."""
+
+    def __init__(
+        self,
+        app,
+        read_limit: int = ADMISSION_READ_LIMIT,
+        write_limit: int = ADMISSION_WRITE_LIMIT,
+        read_queue: int = ADMISSION_READ_QUEUE,
+        write_queue: int = ADMISSION_WRITE_QUEUE,
+        timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        retry_after: float = ADMISSION_RETRY_AFTER,
+    ):
+        self.app = app
+        self.budgets = {
+            "read": Budget("read", read_limit, read_queue, timeout),
+            "write": Budget("write", write_limit, write_queue, timeout),
+        }
+        self.retry_after = retry_after
+        BUDGETS.update(self.budgets)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] in SELF_ADMITTED_PATHS:
+            scope.setdefault("state", {})["admission"] = self
+            await self.app(scope, receive, send)
+            return
+        budget = self.budgets[request_class(scope)]
+        if not await budget.acquire():
+            response = JSONResponse(
+                status_code=503, content={"detail": OVERLOADED_DETAIL}, headers=self.retry_headers()
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
+
+    def retry_headers(self) -> dict:
+        return {"Retry-After": str(math.ceil(self.retry_after))}
+
+
+@contextlib.asynccontextmanager
+async def admitted(request: Request):
+    """Hold the request's admission slot for the block; 503 when it is shed.
+
+    For SELF_ADMITTED_PATHS, around the database work only. A no-op when admission
+    control is off.
+    """
+    middleware = request.scope.get("state", {}).get("admission")
+    if middleware is None:
+        yield
+        return
+    budget = middleware.budgets[request_class(request.scope)]
+    if not await budget.acquire():
+        raise HTTPException(status_code=503, detail=OVERLOADED_DETAIL, headers=middleware.retry_headers())
+    try:
+        yield
+    finally:
+        budget.release()
+
+
+def render_prometheus() -> List[str]:
+    """Admission gauges, counters and queue waits per request class, as Prometheus text lines."""
+    snapshots = [(name, budget.snapshot()) for name, budget in sorted(BUDGETS.items())]
+    lines = []
+    for metric, key, kind, help_text in (
+        ("admission_in_flight", "in_flight", "gauge", "Requests holding an admission slot."),
+        ("admission_queue_depth", "queue_depth", "gauge", "Requests waiting for an admission slot."),
+        ("admission_limit", "limit", "gauge", "Admission slots."),
+        ("admission_queue_size", "queue_size", "gauge", "Admission wait queue capacity."),
+        ("admission_admitted_total", "admitted", "counter", "Requests admitted."),
+    ):
+        lines += metric_header(metric, kind, help_text)
+        lines += [f"{metric}{format_labels(request_class=name)} {stats[key]}" for name, stats in snapshots]
+    lines += metric_header("admission_rejected_total", "counter", "Requests shed with a 503.")
+    for name, stats in snapshots:
+        for reason in ("queue_full", "timeout"):
+            labels = format_labels(request_class=name, reason=reason)
+            lines.append(f"admission_rejected_total{labels} {stats[f'rejected_{reason}']}")
+    lines += metric_header("admission_queue_wait_seconds", "histogram", "Time queued for a slot.")
+    for name, budget in sorted(BUDGETS.items()):
+        lines += histogram_lines("admission_queue_wait_seconds", budget.queue_wait, request_class=name)
+    return lines
@@ -0,0 +1,22 @@
+"""Async counterparts of `crud` functions that cannot go through `AsyncSession.run_sync`.
+
+Everything else runs its `crud` function through `database.Database.run`.
+"""
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from . import crud
+
+
+async def stream_task_rows(
+    bind: AsyncEngine, project_id: Optional[int] = None, batch_size: int = crud.EXPORT_BATCH_SIZE
+) -> AsyncIterator[List[Row]]:
+    """Async counterpart of `crud.stream_task_rows` (generators cannot go through run_sync)."""
+    async with bind.connect() as conn:
+        result = await conn.stream(
+            crud.task_export_query(project_id), execution_options={"yield_per": batch_size}
+        )
+        async for batch in result.partitions():
+            yield batch
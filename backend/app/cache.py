@@ -0,0 +1,147 @@
+"""Read-through entity cache for projects and tasks.
+
+Values are plain dicts of column values so any backend can store them; a shared
+store (Redis, memcached, ...) only needs to implement `CacheBackend`.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class CacheBackend:
+    """Interface every cache store implements."""
+
+    name = "abstract"
+
+    def get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: dict) -> None:
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    """Disables caching while keeping the same call sites."""
+
+    name = "none"
+
+    def __init__(self):
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        self._misses += 1
+        return None
+
+    def set(self, key: str, value: dict) -> None:
+        pass
+
+    def delete(self, *keys: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "size": 0,
+            "hits": 0,
+            "misses": self._misses,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU with a per-entry TTL."""
+
+    name = "memory"
+
+    def __init__(
+        self, max_entries: int = 10_000, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = self._expirations = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "size": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+def project_key(project_id: int) -> str:
+    return f"project:{project_id}"
+
+
+def task_key(task_id: int) -> str:
+    return f"task:{task_id}"
+
+
+def set_backend(backend: CacheBackend) -> None:
+    """Swap the process-wide cache, e.g. for a shared backend."""
+    global entity_cache
+    entity_cache = backend
+
+
+def _from_env() -> CacheBackend:
+    max_entries = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+    if max_entries <= 0:
+        return NullCache()
+    return LRUCache(max_entries=max_entries, ttl=float(os.getenv("ENTITY_CACHE_TTL", "60")))
+
+
+entity_cache: CacheBackend = _from_env()
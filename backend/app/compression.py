@@ -0,0 +1,139 @@
+"""Negotiated gzip/brotli compression of response bodies.
+
+Bodies of compressible media types are compressed when the client accepts it and the
+body is at least COMPRESSION_MIN_SIZE bytes (streamed bodies of unknown size always
+are). Brotli is offered when the optional `brotli` package is installed.
+"""
+import os
+import zlib
+from typing import Dict, Optional, Type
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only without the optional dependency
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Brotli's default (11) suits static assets; 4 beats gzip -6 at a similar speed.
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        self._stream = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._stream.compress(data) + self._stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._stream.compress(data) + self._stream.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self._stream = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._stream.process(data) + self._stream.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._stream.process(data) + self._stream.finish()
+
+
+# Server preference when the client weighs codings equally.
+ENCODERS: Dict[str, Type] = {"br": BrotliEncoder, "gzip": GzipEncoder} if brotli else {"gzip": GzipEncoder}
+
+
+def negotiate(accept_encoding: str) -> Optional[Type]:
+    """Encoder for the highest-weighted supported coding in `Accept-Encoding`, if any."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        if params.strip().startswith("q="):
+            try:
+                weight = float(params.strip()[2:])
+            except ValueError:
+                continue
+        weights[coding.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for name in ENCODERS:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return ENCODERS[best] if best else None
+
+
+class CompressionMiddleware:
+    """Pure ASGI, so streamed bodies (exports) are compressed chunk by chunk."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoder_class = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoder_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # held back until the first body chunk shows the size
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if encoder is not None:
+                data = encoder.chunk(body) if more else encoder.finish(body)
+                await send({"type": "http.response.body", "body": data, "more_body": more})
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            if not self._compressible(start["status"], headers, body, more):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            encoder = encoder_class()
+            headers["Content-Encoding"] = encoder.name
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # Another representation of the same entity: the tag can only be weak.
+                headers["ETag"] = f"W/{etag}"
+            if more:
+                del headers["Content-Length"]
+                data = encoder.chunk(body)
+            else:
+                data = encoder.finish(body)
+                headers["Content-Length"] = str(len(data))
+            await send(start)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, status: int, headers: MutableHeaders, body: bytes, more: bool) -> bool:
+        if status < 200 or status in (204, 304) or "content-encoding" in headers:
+            return False
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        return more or len(body) >= self.minimum_size
@@ -1,88 +1,964 @@
 """CRUD layer for projects and tasks."""
-from typing import List, Optional
+import contextlib
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import (
+    REAL,
+    DateTime,
+    Integer,
+    Row,
+    and_,
+    any_,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError, NoResultFound
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from . import models, schemas
+from . import cache, models, schemas, serialization
+from .pagination import CursorExpired, decode_cursor, decode_cursors, encode_cursors
+
+# How `Task.project` is loaded for task reads: "joined" (one round trip, default)
+# or "selectin" (one extra IN query per batch, smaller rows for wide projects).
+PROJECT_LOADERS = {"joined": joinedload, "selectin": selectinload}
+TASK_PROJECT_LOADER = os.getenv("TASK_PROJECT_LOADER", "joined")
+
+# Task fields that decide which `task_counters` row a task is counted in.
+COUNTED_FIELDS = {"project_id", "status", "priority"}
+UPSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+CounterKey = Tuple[int, models.TaskStatus, int]
+
+FOREIGN_KEY_VIOLATION = "23503"
+
+# `list_tasks` sort keys; a leading "-" sorts descending. Pages are keyed on (key, id).
+TASK_SORT_FIELDS = ("created_at", "updated_at", "priority", "due_date")
+TASK_SORT_PATTERN = f"^-?({'|'.join(TASK_SORT_FIELDS)})$"
+
+# Rows fetched per server-side cursor round trip when streaming exports.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Projects with more tasks than this are only marked deleted; `purge_deleted_projects`
+# then removes their tasks PURGE_CHUNK_SIZE rows per transaction.
+PROJECT_PURGE_THRESHOLD = int(os.getenv("PROJECT_PURGE_THRESHOLD", "10000"))
+PURGE_CHUNK_SIZE = int(os.getenv("PURGE_CHUNK_SIZE", "5000"))
+
+# `GET /sync` positions trail the clock by this many seconds, so a write committed shortly
+# after its timestamp was taken is still sent on the next sync (at worst, twice).
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", "5"))
+# Tombstones are kept this long; sync cursors older than that have to start over.
+SYNC_RETENTION_DAYS = float(os.getenv("SYNC_RETENTION_DAYS", "30"))
+SYNC_EPOCH = datetime(1970, 1, 1)
 
 
 def create_project(db: Session, project_in: schemas.ProjectCreate) -> models.Project:
-    project = models.Project(**project_in.dict())
-    db.add(project)
+    """One INSERT ... RETURNING; a duplicate name raises IntegrityError (unique violation)."""
+    table = models.Project.__table__
+    stmt = insert(table).values(**project_in.dict()).returning(*_stored_columns(table))
+    project = models.Project(**db.execute(stmt).one()._mapping)
     db.commit()
-    db.refresh(project)
     return project
 
 
-def list_projects(db: Session) -> List[models.Project]:
-    return db.execute(select(models.Project).order_by(models.Project.created_at.desc())).scalars().all()
+def list_projects(
+    db: Session, limit: Optional[int] = None, cursor: Optional[str] = None
+) -> List[models.Project]:
+    stmt = select(models.Project).where(models.Project.deleted_at.is_(None))
+    stmt = _keyset(stmt, models.Project, limit, cursor)
+    return db.execute(stmt).scalars().all()
+
+
+def list_project_rows(
+    db: Session, limit: Optional[int] = None, cursor: Optional[str] = None
+) -> List[Row]:
+    """`list_projects` as flat tuples for `serialization.encode_projects`."""
+    columns = [models.Project.__table__.c[name] for name in serialization.PROJECT_FIELDS]
+    stmt = select(*columns).where(models.Project.deleted_at.is_(None))
+    return db.execute(_keyset(stmt, models.Project, limit, cursor)).all()
 
 
 def get_project(db: Session, project_id: int) -> models.Project:
-    project = db.get(models.Project, project_id)
-    if not project:
-        raise NoResultFound(f"Project {project_id} not found")
+    """Read-through lookup; cache hits return a transient copy, so it must not be modified."""
+    cached = cache.entity_cache.get(cache.project_key(project_id))
+    if cached is not None:
+        return models.Project(**cached)
+    project = _load_project(db, project_id)
+    if _fills_cache(db):
+        cache.entity_cache.set(cache.project_key(project_id), _columns(project))
     return project
 
 
+def get_project_with_tasks(
+    db: Session,
+    project_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    statuses: Optional[List[models.TaskStatus]] = None,
+) -> Tuple[models.Project, List[models.Task]]:
+    """A project and one page of its tasks (newest first) in a single round trip.
+
+    The page is a subquery LEFT JOINed to the project row, so a project without matching
+    tasks still comes back once. Tasks are transient and carry no `project`.
+    """
+    projects, tasks = models.Project.__table__, models.Task.__table__
+    page = select(*_stored_columns(tasks)).where(tasks.c.project_id == project_id)
+    if statuses:
+        page = page.where(tasks.c.status.in_(statuses))
+    page = _keyset(page, models.Task, limit, cursor).subquery("page")
+    project_columns = _stored_columns(projects)
+    stmt = (
+        select(*project_columns, *(column.label(f"task__{column.key}") for column in page.c))
+        .outerjoin(page, true())
+        .where(projects.c.id == project_id, projects.c.deleted_at.is_(None))
+    )
+    # The subquery's ORDER BY does not survive the join: order the outer rows the same way.
+    stmt = _keyset(stmt, page.c, None, None)
+    rows = db.execute(stmt).all()
+    if not rows:
+        raise NoResultFound(f"Project {project_id} not found")
+    project = models.Project(**{column.key: getattr(rows[0], column.key) for column in project_columns})
+    if _fills_cache(db):
+        cache.entity_cache.set(cache.project_key(project_id), _columns(project))
+    page_tasks = [
+        models.Task(**{column.key: row._mapping[f"task__{column.key}"] for column in page.c})
+        for row in rows
+        if row.task__id is not None
+    ]
+    return project, page_tasks
+
+
+def get_projects_by_ids(db: Session, ids: List[int]) -> Tuple[List[models.Project], List[int]]:
+    """Projects for `ids` in one query, in request order, plus the ids that matched nothing."""
+    stmt = select(models.Project).where(
+        _id_in(db, models.Project.id, ids), models.Project.deleted_at.is_(None)
+    )
+    return _in_request_order(ids, db.execute(stmt).scalars().all())
+
+
+def project_version(db: Session, project_id: int) -> datetime:
+    """`updated_at` of a project, from the cache when possible."""
+    cached = cache.entity_cache.get(cache.project_key(project_id))
+    if cached is not None:
+        return cached["updated_at"]
+    stmt = select(models.Project.updated_at).where(
+        models.Project.id == project_id, models.Project.deleted_at.is_(None)
+    )
+    updated_at = db.execute(stmt).scalar_one_or_none()
+    if updated_at is None:
+        raise NoResultFound(f"Project {project_id} not found")
+    return updated_at
+
+
+def projects_fingerprint(db: Session) -> Tuple:
+    """Cheap aggregate that changes whenever the project list does."""
+    stmt = select(func.count(models.Project.id), func.max(models.Project.updated_at)).where(
+        models.Project.deleted_at.is_(None)
+    )
+    return tuple(db.execute(stmt).one())
+
+
 def update_project(db: Session, project_id: int, project_in: schemas.ProjectUpdate) -> models.Project:
-    project = get_project(db, project_id)
-    for field, value in project_in.dict(exclude_unset=True).items():
-        setattr(project, field, value)
+    """One UPDATE ... RETURNING; no row means no such project."""
+    table = models.Project.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == project_id, table.c.deleted_at.is_(None))
+        .values(**project_in.dict(exclude_unset=True))
+        .returning(*_stored_columns(table))
+    )
+    row = db.execute(stmt).one_or_none()
+    if row is None:
+        raise NoResultFound(f"Project {project_id} not found")
     db.commit()
-    db.refresh(project)
-    return project
+    cache.entity_cache.delete(cache.project_key(project_id))
+    return models.Project(**row._mapping)
 
 
-def delete_project(db: Session, project_id: int) -> None:
-    project = get_project(db, project_id)
-    db.delete(project)
+def delete_project(db: Session, project_id: int) -> bool:
+    """Delete a project; its tasks and counters go through the ON DELETE CASCADE foreign keys.
+
+    A project with more than PROJECT_PURGE_THRESHOLD tasks is marked deleted instead, which
+    hides it and its tasks at once; `purge_deleted_projects` removes the rows later. Returns
+    True when the purge was deferred.
+    """
+    table = models.Project.__table__
+    task_count = (
+        select(func.coalesce(func.sum(models.TaskCounter.count), 0))
+        .where(models.TaskCounter.project_id == project_id)
+        .scalar_subquery()
+    )
+    found = db.execute(
+        select(table.c.id, task_count).where(table.c.id == project_id, table.c.deleted_at.is_(None))
+    ).one_or_none()
+    if found is None:
+        raise NoResultFound(f"Project {project_id} not found")
+    deferred = found[1] > PROJECT_PURGE_THRESHOLD
+    if deferred:
+        marked = update(table).where(table.c.id == project_id).values(deleted_at=datetime.utcnow())
+        _write_and_log_deletion(db, marked, models.DeletedEntity.PROJECT)
+        # Counters go now, so metrics and list fingerprints drop the tasks right away.
+        db.execute(delete(models.TaskCounter).where(models.TaskCounter.project_id == project_id))
+    else:
+        removed = delete(table).where(table.c.id == project_id)
+        _write_and_log_deletion(db, removed, models.DeletedEntity.PROJECT)
     db.commit()
+    # Cached tasks of this project are dropped lazily: `get_task` re-checks their project.
+    cache.entity_cache.delete(cache.project_key(project_id))
+    return deferred
+
+
+def purge_deleted_projects(db: Session, chunk_size: int = PURGE_CHUNK_SIZE) -> int:
+    """Remove projects marked by `delete_project`, committing every `chunk_size` tasks.
+
+    Short transactions keep row locks and WAL bursts bounded however large the project.
+    Returns the number of tasks removed.
+    """
+    projects, tasks = models.Project.__table__, models.Task.__table__
+    pending = select(projects.c.id).where(projects.c.deleted_at.is_not(None)).order_by(projects.c.id)
+    purged = 0
+    for project_id in db.execute(pending).scalars().all():
+        while True:
+            chunk = select(tasks.c.id).where(tasks.c.project_id == project_id).limit(chunk_size)
+            removed = db.execute(delete(tasks).where(tasks.c.id.in_(chunk.scalar_subquery()))).rowcount
+            db.commit()
+            purged += removed
+            if removed < chunk_size:
+                break
+        db.execute(delete(projects).where(projects.c.id == project_id))
+        db.commit()
+    return purged
 
 
 def create_task(db: Session, task_in: schemas.TaskCreate) -> models.Task:
-    _ensure_project_exists(db, task_in.project_id)
-    task = models.Task(**task_in.dict())
-    db.add(task)
-    db.commit()
-    db.refresh(task)
+    """INSERT ... RETURNING without a project pre-check: the foreign key reports unknown projects."""
+    stmt = insert(models.Task.__table__).values(**task_in.dict())
+    with _project_must_exist(db, task_in.project_id):
+        task = _write_task(db, stmt)
+        if task is None:  # the project is awaiting purge
+            raise NoResultFound(f"Project {task_in.project_id} not found")
+        db.commit()
     return task
 
 
-def list_tasks(db: Session, project_id: Optional[int] = None) -> List[models.Task]:
-    stmt = select(models.Task).order_by(models.Task.created_at.desc())
+def bulk_create_tasks(db: Session, tasks_in: List[schemas.TaskCreate]) -> schemas.TaskBulkResult:
+    """Insert many tasks with one project lookup, batched multi-row INSERT ... RETURNING and one commit.
+
+    A project deleted between the lookup and the insert fails the foreign key; the batch is
+    rolled back, the lookup repeated, and that project's items reported like unknown ones.
+    """
+    project_ids = {task_in.project_id for task_in in tasks_in}
+    while True:
+        existing = _live_project_ids(db, project_ids)
+        result = schemas.TaskBulkResult()
+        indexes, rows, deltas = [], [], Counter()
+        for index, task_in in enumerate(tasks_in):
+            if task_in.project_id not in existing:
+                result.errors.append(
+                    schemas.BulkItemError(index=index, detail=f"Project {task_in.project_id} not found")
+                )
+                continue
+            indexes.append(index)
+            rows.append(dict(task_in))
+            deltas[_counter_key(task_in)] += 1
+        if not rows:
+            return result
+        # Core insert on the table skips ORM bulk bookkeeping we do not need here.
+        table = models.Task.__table__
+        stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        try:
+            ids = db.execute(stmt, rows).scalars().all()
+            _bump_counters(db, deltas)
+            db.commit()
+        except IntegrityError as exc:
+            db.rollback()
+            if not _is_foreign_key_violation(exc):
+                raise
+            # Each retry follows a project that vanished, so this ends within len(project_ids) rounds.
+            project_ids = existing
+            continue
+        result.created = [schemas.BulkItemCreated(index=i, id=task_id) for i, task_id in zip(indexes, ids)]
+        return result
+
+
+def list_tasks(
+    db: Session,
+    project_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    statuses: Optional[List[models.TaskStatus]] = None,
+    priority_min: Optional[int] = None,
+    priority_max: Optional[int] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    overdue: bool = False,
+    sort: str = "-created_at",
+) -> List[models.Task]:
+    """Filtered task page; due date bounds are inclusive and `overdue` means open and past due."""
+    stmt = _filter_tasks(
+        select(models.Task).options(_project_loader()),
+        project_id,
+        statuses,
+        priority_min,
+        priority_max,
+        due_from,
+        due_to,
+        overdue,
+    )
+    stmt = _keyset(stmt, models.Task, limit, cursor, sort)
+    return db.execute(stmt).scalars().all()
+
+
+def list_task_rows(
+    db: Session,
+    project_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: str = "-created_at",
+    fields: Sequence[str] = serialization.TASK_OUT_FIELDS,
+    **filters,
+) -> List[Row]:
+    """`list_tasks` as flat tuples for `serialization.encode_tasks`: no ORM entities.
+
+    Only the requested `fields` are selected, and projects are joined only for `project`.
+    The page's cursor columns (id and sort key) are appended when not requested.
+    """
+    tasks, projects = models.Task.__table__, models.Project.__table__
+    names = [name for name in fields if name != "project"]
+    columns = [tasks.c[name] for name in names]
+    if "project" in fields:
+        columns += [projects.c[name].label(f"project__{name}") for name in serialization.PROJECT_FIELDS]
+    columns += [tasks.c[name] for name in ("id", _sort_field(sort)[0]) if name not in names]
+    stmt = select(*columns)
+    if "project" in fields:
+        stmt = stmt.join(models.Task.project)
+    stmt = _keyset(_filter_tasks(stmt, project_id, **filters), models.Task, limit, cursor, sort)
+    return db.execute(stmt).all()
+
+
+def sort_key(sort: str = "-created_at"):
+    """Cursor key of a row for pages ordered by `sort` (see `split_page`)."""
+    field = _sort_field(sort)[0]
+    return lambda item: (getattr(item, field), item.id)
+
+
+def search_tasks(
+    db: Session,
+    q: str,
+    project_id: Optional[int] = None,
+    status: Optional[models.TaskStatus] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> List[Row]:
+    """Full-text match on title and description, best rank first; rows are `(Task, rank)`.
+
+    `q` uses web search syntax ("quoted phrase", or, -excluded). Postgres only.
+    """
+    query = func.websearch_to_tsquery(models.SEARCH_CONFIG, q)
+    rank = func.ts_rank(models.Task.search_vector, query, type_=REAL).label("rank")
+    stmt = (
+        select(models.Task, rank)
+        .options(_project_loader())
+        .where(models.Task.search_vector.bool_op("@@")(query), _in_live_project())
+    )
     if project_id:
         stmt = stmt.where(models.Task.project_id == project_id)
-    return db.execute(stmt).scalars().all()
+    if status:
+        stmt = stmt.where(models.Task.status == status)
+    if cursor:
+        last_rank, row_id = decode_cursor(cursor, float)
+        # ts_rank is a float4: compare as REAL so the cursor's rank equals the row's own.
+        stmt = stmt.where(tuple_(rank, models.Task.id) < tuple_(cast(last_rank, REAL), row_id))
+    stmt = stmt.order_by(rank.desc(), models.Task.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.execute(stmt).all()
 
 
 def get_task(db: Session, task_id: int) -> models.Task:
-    task = db.get(models.Task, task_id)
-    if not task:
-        raise NoResultFound(f"Task {task_id} not found")
+    """Read-through lookup; the project is resolved through its own cache entry."""
+    cached = cache.entity_cache.get(cache.task_key(task_id))
+    if cached is not None:
+        try:
+            project = get_project(db, cached["project_id"])
+        except NoResultFound:
+            cache.entity_cache.delete(cache.task_key(task_id))
+            raise NoResultFound(f"Task {task_id} not found") from None
+        task = models.Task(**cached)
+        # No backref events: the copy must never join `project.tasks` or the session.
+        set_committed_value(task, "project", project)
+        return task
+    task = _load_task(db, task_id)
+    if _fills_cache(db):
+        cache.entity_cache.set(cache.task_key(task_id), _columns(task))
+        cache.entity_cache.set(cache.project_key(task.project_id), _columns(task.project))
     return task
 
 
+def get_tasks_by_ids(db: Session, ids: List[int]) -> Tuple[List[models.Task], List[int]]:
+    """Tasks for `ids` with their projects in one query, in request order, plus the missing ids."""
+    stmt = (
+        select(models.Task)
+        .options(_project_loader())
+        .where(_id_in(db, models.Task.id, ids), _in_live_project())
+    )
+    return _in_request_order(ids, db.execute(stmt).scalars().all())
+
+
+def task_version(db: Session, task_id: int) -> Tuple[datetime, datetime]:
+    """`updated_at` of a task and of its project, from the cache when possible."""
+    cached = cache.entity_cache.get(cache.task_key(task_id))
+    if cached is not None:
+        try:
+            return cached["updated_at"], project_version(db, cached["project_id"])
+        except NoResultFound:
+            raise NoResultFound(f"Task {task_id} not found") from None
+    stmt = (
+        select(models.Task.updated_at, models.Project.updated_at)
+        .join(models.Task.project)
+        .where(models.Task.id == task_id, models.Project.deleted_at.is_(None))
+    )
+    row = db.execute(stmt).one_or_none()
+    if row is None:
+        raise NoResultFound(f"Task {task_id} not found")
+    return tuple(row)
+
+
+def tasks_fingerprint(db: Session, project_id: Optional[int] = None) -> Tuple:
+    """Task count (from `task_counters`) plus the newest task and project edits, in one round trip.
+
+    Deletes move the count, inserts and updates move max(updated_at), and project edits
+    (embedded in every task payload) move the project maximum.
+    """
+    count = select(func.coalesce(func.sum(models.TaskCounter.count), 0))
+    newest = select(func.max(models.Task.updated_at)).where(_in_live_project())
+    if project_id:
+        count = count.where(models.TaskCounter.project_id == project_id)
+        newest = newest.where(models.Task.project_id == project_id)
+    stmt = select(
+        count.scalar_subquery(),
+        newest.scalar_subquery(),
+        select(func.max(models.Project.updated_at)).scalar_subquery(),
+    )
+    return tuple(db.execute(stmt).one())
+
+
+def task_export_query(project_id: Optional[int] = None):
+    """Flat task rows plus their project's name, in id order; no ORM entities involved."""
+    stmt = (
+        select(*_stored_columns(models.Task.__table__), models.Project.name.label("project_name"))
+        .join(models.Task.project)
+        .where(models.Project.deleted_at.is_(None))
+        .order_by(models.Task.id)
+    )
+    if project_id:
+        stmt = stmt.where(models.Task.project_id == project_id)
+    return stmt
+
+
+def stream_task_rows(
+    bind, project_id: Optional[int] = None, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[Row]]:
+    """Yield export rows in batches from a server-side cursor.
+
+    The stream runs on its own connection: the response body is produced after the
+    request's session has been handed back.
+    """
+    with bind.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(task_export_query(project_id))
+        yield from result.partitions()
+
+
 def update_task(db: Session, task_id: int, task_in: schemas.TaskUpdate) -> models.Task:
-    task = get_task(db, task_id)
+    """UPDATE ... RETURNING; moving counters need the row's previous key, read under a row lock."""
     data = task_in.dict(exclude_unset=True)
-    if "project_id" in data:
-        _ensure_project_exists(db, data["project_id"])
-    for field, value in data.items():
-        setattr(task, field, value)
-    db.commit()
-    db.refresh(task)
+    table = models.Task.__table__
+    stmt = update(table).where(table.c.id == task_id).values(**data)
+    old = None
+    if COUNTED_FIELDS & data.keys():
+        old = select(table.c.id, *_counter_columns(table)).where(table.c.id == task_id).with_for_update()
+    with _project_must_exist(db, data.get("project_id")):
+        task = _write_task(db, stmt, old=old, counted=old is not None)
+        if task is None:
+            raise NoResultFound(f"Task {task_id} not found")
+        db.commit()
+    cache.entity_cache.delete(cache.task_key(task_id))
     return task
 
 
+def bulk_update_tasks(db: Session, bulk_in: schemas.TaskBulkUpdate) -> schemas.TaskBulkUpdateResult:
+    """Apply one partial update to many tasks as a single UPDATE ... RETURNING.
+
+    When counted fields change, Postgres also locks the rows and moves their counters in that
+    same statement (see `_write_task`).
+    """
+    data = bulk_in.changes.dict(exclude_unset=True)
+    table = models.Task.__table__
+    if "project_id" in data:
+        # A move needs a live destination; FOR SHARE holds off its deletion until we commit.
+        destination = (
+            select(models.Project.id)
+            .where(models.Project.id == data["project_id"], models.Project.deleted_at.is_(None))
+            .with_for_update(read=True)
+        )
+        if db.execute(destination).first() is None:
+            raise NoResultFound(f"Project {data['project_id']} not found")
+    if bulk_in.ids is not None:
+        target = _id_in(db, table.c.id, bulk_in.ids)
+    else:
+        criteria = bulk_in.filter.dict(exclude_none=True)
+        target = and_(*(table.c[field] == value for field, value in criteria.items()))
+    target = and_(target, _in_live_project(table.c.project_id))
+    # Core updates still fire the column's `onupdate`, so `updated_at` moves with the rows.
+    stmt = update(table).values(**data).returning(table.c.id)
+    counted = bool(COUNTED_FIELDS & data.keys())
+    with _project_must_exist(db, data.get("project_id")):
+        if counted and _single_statement_writes(db):
+            # Lock the matching rows, update them FROM the locked set and move their counters;
+            # no id list is sent back to the server, however many rows match.
+            old = select(table.c.id, *_counter_columns(table)).where(target).with_for_update().cte("old")
+            written = stmt.where(table.c.id == old.c.id).returning(*_counter_columns(table)).cte("written")
+            deltas = union_all(
+                select(*_counter_columns(written), literal(1).label("delta")),
+                select(*_counter_columns(old), literal(-1)),
+            )
+            counter_cte = _counter_upsert(db, deltas).cte("counted")
+            updated = db.execute(select(written.c.id).add_cte(counter_cte)).scalars().all()
+        elif counted:
+            # Other dialects: read the old counter keys under the lock, then update those rows.
+            old = select(table.c.id, *_counter_columns(table)).where(target).with_for_update()
+            old_rows = db.execute(old).all()
+            updated = db.execute(stmt.where(table.c.id.in_([row.id for row in old_rows]))).scalars().all()
+            deltas = Counter()
+            for row in old_rows:
+                deltas[_counter_key(row)] -= 1
+                deltas[(
+                    data.get("project_id", row.project_id),
+                    data.get("status", row.status),
+                    data.get("priority", row.priority),
+                )] += 1
+            _bump_counters(db, deltas)
+        else:
+            updated = db.execute(stmt.where(target)).scalars().all()
+        db.commit()
+    cache.entity_cache.delete(*(cache.task_key(task_id) for task_id in updated))
+    missing = sorted(set(bulk_in.ids) - set(updated)) if bulk_in.ids is not None else []
+    return schemas.TaskBulkUpdateResult(updated=sorted(updated), missing=missing)
+
+
 def delete_task(db: Session, task_id: int) -> None:
-    task = get_task(db, task_id)
-    db.delete(task)
+    """DELETE ... RETURNING the counter key; on Postgres the decrement and tombstone ride along as CTEs."""
+    table = models.Task.__table__
+    stmt = (
+        delete(table)
+        .where(table.c.id == task_id, _in_live_project(table.c.project_id))
+        .returning(table.c.id, *_counter_columns(table))
+    )
+    if _single_statement_writes(db):
+        deleted = stmt.cte("deleted")
+        decrement = select(*_counter_columns(deleted), literal(-1).label("delta"))
+        logged = _deletion_log(models.DeletedEntity.TASK, deleted.c.id).cte("logged")
+        found = db.execute(_counter_upsert(db, decrement).add_cte(deleted, logged)).first()
+    else:
+        found = db.execute(stmt).one_or_none()
+        if found is not None:
+            _bump_counters(db, Counter({_counter_key(found): -1}))
+            db.execute(_deletion_log(models.DeletedEntity.TASK, literal(task_id)))
+    if found is None:
+        raise NoResultFound(f"Task {task_id} not found")
     db.commit()
+    cache.entity_cache.delete(cache.task_key(task_id))
 
 
-def _ensure_project_exists(db: Session, project_id: int) -> None:
-    if not db.get(models.Project, project_id):
+def get_changes(db: Session, cursor: Optional[str], limit: int) -> schemas.SyncResult:
+    """Projects and tasks written, and ids deleted, after `cursor` (None: everything).
+
+    Each stream is read in (timestamp, id) order off its index, up to `limit` rows. A
+    stream that is caught up moves its position to now - SYNC_SETTLE_SECONDS rather than
+    to its last row, so rows committed late with an earlier timestamp are not skipped;
+    the next sync may repeat a few of them, which clients apply as idempotent upserts.
+    """
+    now = datetime.utcnow()
+    horizon = (now - timedelta(seconds=SYNC_SETTLE_SECONDS), 0)
+    if cursor:
+        positions = decode_cursors(cursor, 3)
+        if positions[2][0] < now - timedelta(days=SYNC_RETENTION_DAYS):
+            raise CursorExpired("Sync cursor has expired; sync again without a cursor")
+    else:
+        # A fresh client has nothing to delete; only deletions during its first sync matter.
+        positions = [(SYNC_EPOCH, 0), (SYNC_EPOCH, 0), horizon]
+    streams = (
+        (select(models.Project).where(models.Project.deleted_at.is_(None)), models.Project.updated_at),
+        (select(models.Task).where(_in_live_project()), models.Task.updated_at),
+        (select(models.Deletion), models.Deletion.deleted_at),
+    )
+    pages, next_positions, has_more = [], [], False
+    for (stmt, column), (key, row_id) in zip(streams, positions):
+        model = column.class_
+        stmt = stmt.where(_seek(column, model.id, key, row_id, descending=False))
+        rows = db.scalars(stmt.order_by(column, model.id).limit(limit + 1)).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_positions.append((getattr(rows[-1], column.key), rows[-1].id))
+            has_more = True
+        else:
+            next_positions.append(max((key, row_id), horizon))
+        pages.append(rows)
+    projects, tasks, deletions = pages
+    deleted = {entity: [] for entity in models.DeletedEntity}
+    for deletion in deletions:
+        deleted[deletion.entity].append(deletion.entity_id)
+    return schemas.SyncResult(
+        projects=projects,
+        tasks=tasks,
+        deleted=schemas.SyncDeleted(
+            projects=deleted[models.DeletedEntity.PROJECT], tasks=deleted[models.DeletedEntity.TASK]
+        ),
+        cursor=encode_cursors(next_positions),
+        has_more=has_more,
+    )
+
+
+def prune_deletions(db: Session) -> int:
+    """Drop tombstones older than SYNC_RETENTION_DAYS; returns how many went."""
+    cutoff = datetime.utcnow() - timedelta(days=SYNC_RETENTION_DAYS)
+    removed = db.execute(delete(models.Deletion).where(models.Deletion.deleted_at < cutoff)).rowcount
+    db.commit()
+    return removed
+
+
+def get_task_metrics(db: Session, project_id: Optional[int] = None) -> schemas.TaskMetrics:
+    """Read status/priority totals from `task_counters` and count overdue tasks off the partial index."""
+    counters = select(
+        models.TaskCounter.status, models.TaskCounter.priority, func.sum(models.TaskCounter.count)
+    ).group_by(models.TaskCounter.status, models.TaskCounter.priority)
+    overdue = select(func.count()).select_from(models.Task).where(*_overdue_clauses(), _in_live_project())
+    if project_id is not None:
+        _ensure_project_exists(db, project_id)
+        counters = counters.where(models.TaskCounter.project_id == project_id)
+        overdue = overdue.where(models.Task.project_id == project_id)
+
+    by_status: Dict[models.TaskStatus, int] = {status: 0 for status in models.TaskStatus}
+    by_priority: Dict[int, int] = {priority: 0 for priority in range(1, 6)}
+    for status, priority, count in db.execute(counters):
+        by_status[status] += count
+        by_priority[priority] = by_priority.get(priority, 0) + count
+    return schemas.TaskMetrics(
+        total=sum(by_status.values()),
+        by_status=by_status,
+        by_priority=by_priority,
+        overdue=db.execute(overdue).scalar_one(),
+    )
+
+
+def rebuild_task_counters(db: Session) -> None:
+    """Recompute `task_counters` from the tasks table (backfill for pre-existing data)."""
+    db.execute(delete(models.TaskCounter))
+    grouped = (
+        select(models.Task.project_id, models.Task.status, models.Task.priority, func.count())
+        .where(_in_live_project())
+        .group_by(models.Task.project_id, models.Task.status, models.Task.priority)
+    )
+    db.execute(
+        insert(models.TaskCounter).from_select(["project_id", "status", "priority", "count"], grouped)
+    )
+    db.commit()
+
+
+def _load_project(db: Session, project_id: int) -> models.Project:
+    project = db.get(models.Project, project_id)
+    if not project or project.deleted_at is not None:
         raise NoResultFound(f"Project {project_id} not found")
+    return project
+
+
+def _load_task(db: Session, task_id: int) -> models.Task:
+    task = db.get(models.Task, task_id, options=[_project_loader()])
+    if not task or task.project.deleted_at is not None:
+        raise NoResultFound(f"Task {task_id} not found")
+    return task
+
+
+def _fills_cache(db: Session) -> bool:
+    # A lagging replica could put back a row that a write has just invalidated.
+    return not db.info.get("replica")
+
+
+def _columns(instance) -> dict:
+    return {column.key: getattr(instance, column.key) for column in _stored_columns(instance.__table__)}
+
+
+def _stored_columns(table) -> list:
+    """Columns the app writes itself; database-computed ones (search vectors) are left out."""
+    return [column for column in table.columns if column.computed is None]
+
+
+def _counter_key(task) -> CounterKey:
+    return task.project_id, task.status, task.priority
+
+
+def _bump_counters(db: Session, deltas: Counter) -> None:
+    """Apply counter deltas with one multi-row upsert, in key order to avoid lock-order deadlocks."""
+    rows = [
+        {"project_id": project_id, "status": status, "priority": priority, "count": delta}
+        for (project_id, status, priority), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+    db.execute(_on_counter_conflict(UPSERTS[db.get_bind().dialect.name](models.TaskCounter).values(rows)))
+
+
+def _counter_upsert(db: Session, deltas):
+    """Counter upsert fed by a SELECT of (project_id, status, priority, delta) rows."""
+    deltas = deltas.subquery()
+    keys = (deltas.c.project_id, deltas.c.status, deltas.c.priority)
+    grouped = (
+        select(*keys, func.sum(deltas.c.delta))
+        .group_by(*keys)
+        .having(func.sum(deltas.c.delta) != 0)
+        .order_by(*keys)  # same lock order as `_bump_counters`
+    )
+    stmt = UPSERTS[db.get_bind().dialect.name](models.TaskCounter).from_select(
+        ["project_id", "status", "priority", "count"], grouped
+    )
+    return _on_counter_conflict(stmt).returning(models.TaskCounter.project_id)
+
+
+def _on_counter_conflict(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=["project_id", "status", "priority"],
+        set_={"count": models.TaskCounter.count + stmt.excluded["count"]},
+    )
+
+
+def _counter_columns(table) -> tuple:
+    return table.c.project_id, table.c.status, table.c.priority
+
+
+def _deletion_log(entity: models.DeletedEntity, entity_ids):
+    """INSERT ... SELECT of tombstones for `entity_ids` (a RETURNING CTE column or a literal)."""
+    rows = select(
+        literal(entity, models.Deletion.entity.type), entity_ids, literal(datetime.utcnow(), DateTime)
+    )
+    return insert(models.Deletion).from_select(["entity", "entity_id", "deleted_at"], rows)
+
+
+def _write_and_log_deletion(db: Session, written, entity: models.DeletedEntity) -> None:
+    """Run a DELETE (or soft-delete UPDATE) and log the ids it hit; one statement on Postgres."""
+    written = written.returning(written.table.c.id)
+    if _single_statement_writes(db):
+        removed = written.cte("removed")
+        db.execute(_deletion_log(entity, removed.c.id).add_cte(removed))
+        return
+    for entity_id in db.scalars(written).all():
+        db.execute(_deletion_log(entity, literal(entity_id)))
+
+
+def _live_project_ids(db: Session, project_ids) -> set:
+    """The ids among `project_ids` of projects that exist and are not awaiting purge."""
+    return set(
+        db.scalars(
+            select(models.Project.id).where(
+                models.Project.id.in_(project_ids), models.Project.deleted_at.is_(None)
+            )
+        )
+    )
+
+
+def _single_statement_writes(db: Session) -> bool:
+    """Postgres allows data-modifying CTEs, so a write and its side effects share one statement."""
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _write_task(db: Session, written, old=None, counted: bool = True) -> Optional[models.Task]:
+    """Run a task INSERT/UPDATE with RETURNING, its counter deltas and the project lookup.
+
+    `old` selects `(id, *counter key)` of the rows an update will touch, under FOR UPDATE.
+    Postgres runs everything as one statement; other dialects (SQLite in unit tests) run
+    the same steps one by one.
+    Returns None when an UPDATE matched no row; the caller commits.
+    """
+    task_columns = _stored_columns(models.Task.__table__)
+    written = written.returning(*task_columns)
+    if not _single_statement_writes(db):
+        old_row = db.execute(old).one_or_none() if old is not None else None
+        row = db.execute(written).one_or_none()
+        if row is None:
+            return None
+        task = models.Task(**row._mapping)
+        if counted:
+            deltas = Counter({_counter_key(task): 1})
+            if old_row is not None:
+                deltas[_counter_key(old_row)] -= 1
+            _bump_counters(db, deltas)
+        set_committed_value(task, "project", get_project(db, task.project_id))
+        return task
+
+    if old is not None:
+        old = old.cte("old")
+        # UPDATE ... FROM old: the lock is taken before the row changes. A separate FOR UPDATE
+        # running after the UPDATE would skip the row it just modified.
+        written = written.where(models.Task.__table__.c.id == old.c.id)
+    written = written.cte("written")
+    projects = models.Project.__table__
+    project_columns = _stored_columns(projects)
+    # A project awaiting purge matches no row: the caller raises and the write is rolled back.
+    stmt = select(*written.c, *(column.label(f"project__{column.key}") for column in project_columns)).join(
+        projects, and_(projects.c.id == written.c.project_id, projects.c.deleted_at.is_(None))
+    )
+    if counted:
+        deltas = [select(*_counter_columns(written), literal(1).label("delta"))]
+        if old is not None:
+            deltas.append(select(*_counter_columns(old), literal(-1)))
+        stmt = stmt.add_cte(_counter_upsert(db, union_all(*deltas)).cte("counted"))
+    row = db.execute(stmt).one_or_none()
+    if row is None:
+        return None
+    values = row._mapping
+    task = models.Task(**{column.key: values[column.key] for column in task_columns})
+    project = models.Project(**{column.key: values[f"project__{column.key}"] for column in project_columns})
+    set_committed_value(task, "project", project)
+    return task
+
+
+@contextlib.contextmanager
+def _project_must_exist(db: Session, project_id: Optional[int]):
+    """Roll back a failed write; a foreign key violation means `project_id` does not exist."""
+    try:
+        yield
+    except IntegrityError as exc:
+        db.rollback()
+        if project_id is not None and _is_foreign_key_violation(exc):
+            raise NoResultFound(f"Project {project_id} not found") from None
+        raise
+    except NoResultFound:
+        db.rollback()
+        raise
+
+
+def _is_foreign_key_violation(exc: IntegrityError) -> bool:
+    # psycopg2 exposes `pgcode`, asyncpg `sqlstate`; SQLite only has the message.
+    code = getattr(exc.orig, "pgcode", None) or getattr(exc.orig, "sqlstate", None)
+    return code == FOREIGN_KEY_VIOLATION or "FOREIGN KEY constraint failed" in str(exc.orig)
+
+
+def _id_in(db: Session, column, ids: List[int]):
+    """`column = ANY(:ids)` on Postgres, a plain IN list elsewhere.
+
+    The single array parameter keeps one statement text (and plan) whatever the number of ids.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return column == any_(literal(list(ids), postgresql.ARRAY(Integer)))
+    return column.in_(ids)
+
+
+def _in_request_order(ids: List[int], found: list) -> Tuple[list, List[int]]:
+    by_id = {item.id: item for item in found}
+    requested = list(dict.fromkeys(ids))
+    return [by_id[i] for i in requested if i in by_id], [i for i in requested if i not in by_id]
+
+
+def _in_live_project(project_id=models.Task.project_id):
+    """Excludes tasks of projects awaiting purge; there are few, so this stays a small hashed NOT IN."""
+    return project_id.not_in(select(models.Project.id).where(models.Project.deleted_at.is_not(None)))
+
+
+def _project_loader():
+    try:
+        return PROJECT_LOADERS[TASK_PROJECT_LOADER](models.Task.project)
+    except KeyError:
+        raise ValueError(f"Unknown TASK_PROJECT_LOADER {TASK_PROJECT_LOADER!r}") from None
+
+
+def _filter_tasks(
+    stmt,
+    project_id: Optional[int] = None,
+    statuses: Optional[List[models.TaskStatus]] = None,
+    priority_min: Optional[int] = None,
+    priority_max: Optional[int] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    overdue: bool = False,
+):
+    stmt = stmt.where(_in_live_project())
+    if project_id:
+        stmt = stmt.where(models.Task.project_id == project_id)
+    if statuses:
+        stmt = stmt.where(models.Task.status.in_(statuses))
+    if priority_min is not None:
+        stmt = stmt.where(models.Task.priority >= priority_min)
+    if priority_max is not None:
+        stmt = stmt.where(models.Task.priority <= priority_max)
+    if due_from is not None:
+        stmt = stmt.where(models.Task.due_date >= due_from)
+    if due_to is not None:
+        stmt = stmt.where(models.Task.due_date <= due_to)
+    if overdue:
+        stmt = stmt.where(*_overdue_clauses())
+    return stmt
+
+
+def today() -> date:
+    """The (UTC) date `overdue` is measured against."""
+    return datetime.utcnow().date()
+
+
+def _overdue_clauses() -> tuple:
+    # Spelled like the predicate of `ix_tasks_open_due_date` so the planner can use it.
+    return models.Task.status != models.TaskStatus.DONE, models.Task.due_date < today()
+
+
+def _sort_field(sort: str) -> Tuple[str, bool]:
+    field = sort.lstrip("-")
+    if field not in TASK_SORT_FIELDS:
+        raise ValueError(f"Unknown sort {sort!r}")
+    return field, sort.startswith("-")
+
+
+def _keyset(stmt, model, limit: Optional[int], cursor: Optional[str], sort: str = "-created_at"):
+    """Order on `(sort key, id)` and seek past `cursor`; newest first by default.
+
+    Nulls sort as the largest key (last ascending, first descending), as in Postgres
+    btree indexes, so either direction is a plain index scan.
+    """
+    field, descending = _sort_field(sort)
+    column = getattr(model, field)
+    if cursor:
+        key, row_id = decode_cursor(cursor, column.type.python_type)
+        stmt = stmt.where(_seek(column, model.id, key, row_id, descending))
+    if descending:
+        stmt = stmt.order_by(column.desc().nulls_first(), model.id.desc())
+    else:
+        stmt = stmt.order_by(column.asc().nulls_last(), model.id.asc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def _seek(column, id_column, key, row_id: int, descending: bool):
+    """Rows strictly after `(key, row_id)` in `_keyset` order."""
+    if key is None:
+        after_nulls = and_(column.is_(None), id_column < row_id if descending else id_column > row_id)
+        return or_(after_nulls, column.is_not(None)) if descending else after_nulls
+    if descending:
+        return tuple_(column, id_column) < tuple_(key, row_id)
+    after = tuple_(column, id_column) > tuple_(key, row_id)
+    return or_(after, column.is_(None)) if column.nullable else after
+
+
+def _ensure_project_exists(db: Session, project_id: int) -> None:
+    get_project(db, project_id)
@@ -0,0 +1,38 @@
+"""Entity tags and conditional GET helpers."""
+import hashlib
+from typing import Optional
+
+from fastapi import Response, status
+
+
+def make_etag(*parts) -> str:
+    """A weak tag: bodies are equivalent rather than byte-identical (compressed or not)."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison, as required for If-None-Match."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    opaque = etag.removeprefix("W/")
+    return "*" in candidates or opaque in (tag.removeprefix("W/") for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+
+
+def cache_headers(etag: str) -> dict:
+    # `no-cache` lets browsers keep the body but revalidate it on every use.
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def project_etag(project_id: int, updated_at) -> str:
+    return make_etag("project", project_id, updated_at.isoformat())
+
+
+def task_etag(task_id: int, updated_at, project_updated_at) -> str:
+    # Task payloads embed their project, so a project edit must change the task's tag too.
+    return make_etag("task", task_id, updated_at.isoformat(), project_updated_at.isoformat())
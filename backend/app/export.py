@@ -0,0 +1,88 @@
+"""Streaming encoders for the task export."""
+import csv
+import enum
+import io
+import json
+from datetime import date
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Sequence
+
+from sqlalchemy import Row
+
+# Column order of every export format; matches `crud.task_export_query`.
+EXPORT_COLUMNS = (
+    "id",
+    "title",
+    "description",
+    "status",
+    "priority",
+    "due_date",
+    "created_at",
+    "updated_at",
+    "project_id",
+    "project_name",
+)
+
+
+class DataFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {DataFormat.NDJSON: "application/x-ndjson", DataFormat.CSV: "text/csv"}
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, date):  # also datetime
+        return value.isoformat()
+    return value
+
+
+def _values(row: Row) -> List:
+    mapping = row._mapping
+    return [_plain(mapping[column]) for column in EXPORT_COLUMNS]
+
+
+def encode_ndjson(batch: Sequence[Row]) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, _values(row))), ensure_ascii=False) + "\n" for row in batch
+    )
+
+
+def encode_csv(batch: Sequence[Row], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(_values(row) for row in batch)
+    return buffer.getvalue()
+
+
+def _encode(fmt: DataFormat, batch: Sequence[Row], first: bool) -> str:
+    if fmt is DataFormat.CSV:
+        return encode_csv(batch, header=first)
+    return encode_ndjson(batch)
+
+
+def stream(batches: Iterable[Sequence[Row]], fmt: DataFormat) -> Iterator[str]:
+    """One chunk per fetched batch, so memory stays bounded by the batch size."""
+    first = True
+    for batch in batches:
+        yield _encode(fmt, batch, first)
+        first = False
+    if first and fmt is DataFormat.CSV:
+        yield encode_csv([], header=True)
+
+
+async def astream(batches: AsyncIterable[Sequence[Row]], fmt: DataFormat) -> AsyncIterator[str]:
+    first = True
+    async for batch in batches:
+        yield _encode(fmt, batch, first)
+        first = False
+    if first and fmt is DataFormat.CSV:
+        yield encode_csv([], header=True)
+
+
+def content_disposition(fmt: DataFormat) -> dict:
+    return {"Content-Disposition": f'attachment; filename="tasks.{fmt.value}"'}
@@ -0,0 +1,371 @@
+"""Bulk import of projects and tasks from CSV or NDJSON.
+
+Rows are validated in chunks, loaded into a temporary staging table (with
+`COPY ... FROM STDIN` on psycopg2) and merged into `projects`/`tasks` with
+set-based statements, one transaction per chunk.
+
+    python -m app.importer projects projects.csv
+    python -m app.importer tasks tasks.ndjson --on-conflict skip
+"""
+import argparse
+import contextlib
+import csv
+import enum
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    cast,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.engine import Connection
+
+from . import cache, models, schemas
+from .crud import UPSERTS
+from .export import DataFormat
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+# Failed rows beyond this are counted in `failed` but not listed.
+MAX_REPORTED_ERRORS = 1000
+COPY_NULL = "\\N"
+
+
+class ImportKind(str, enum.Enum):
+    PROJECTS = "projects"
+    TASKS = "tasks"
+
+
+class OnConflict(str, enum.Enum):
+    """What to do with a project whose name already exists."""
+
+    SKIP = "skip"
+    UPDATE = "update"
+
+
+# Temporary tables: they only exist on the connection running the import.
+_staging = MetaData()
+PROJECT_STAGING = Table(
+    "import_projects",
+    _staging,
+    Column("line", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("description", Text),
+    prefixes=["TEMPORARY"],
+)
+TASK_STAGING = Table(
+    "import_tasks",
+    _staging,
+    Column("line", Integer, primary_key=True),
+    Column("title", String(150), nullable=False),
+    Column("description", Text),
+    Column("status", String(20), nullable=False),
+    Column("priority", Integer, nullable=False),
+    Column("due_date", Date),
+    Column("project_id", Integer),
+    Column("project_name", String(100)),
+    prefixes=["TEMPORARY"],
+)
+
+Progress = Callable[[schemas.ImportResult], None]
+
+
+def read_records(lines: Iterable[str], fmt: DataFormat) -> Iterator[object]:
+    """Raw records; empty CSV fields become None and a bad line yields its error instead.
+
+    Input that is not UTF-8 ends the import at that point: the text decoder cannot resume mid-stream.
+    """
+    if fmt is DataFormat.CSV:
+        reader = csv.DictReader(lines)
+        try:
+            reader.fieldnames  # a bad header line fails the import, not the first row
+        except (csv.Error, UnicodeDecodeError) as exc:
+            yield exc
+            return
+        records: Iterator[dict] = reader
+    else:
+        records = (line for line in lines if line.strip())
+    while True:
+        try:
+            record = next(records)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as exc:
+            yield exc
+            return
+        except csv.Error as exc:
+            yield exc
+            continue
+        if fmt is DataFormat.NDJSON:
+            try:
+                record = json.loads(record)
+            except ValueError as exc:
+                yield exc
+                continue
+        elif None in record:  # DictReader files surplus fields under None
+            header = len(reader.fieldnames)
+            yield ValueError(f"{header + len(record[None])} fields, the header has {header}")
+            continue
+        else:
+            record = {key: value if value != "" else None for key, value in record.items()}
+        yield record
+
+
+def run_import(
+    bind,
+    lines: Iterable[str],
+    kind: ImportKind,
+    fmt: DataFormat = DataFormat.NDJSON,
+    on_conflict: OnConflict = OnConflict.SKIP,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Optional[Progress] = None,
+) -> schemas.ImportResult:
+    """Import every record from `lines`; `progress` is called after each committed chunk."""
+    result = schemas.ImportResult()
+    staging = PROJECT_STAGING if kind is ImportKind.PROJECTS else TASK_STAGING
+    started = time.perf_counter()
+    with bind.connect() as conn:
+        staging.create(conn, checkfirst=True)
+        try:
+            for chunk in _chunks(enumerate(read_records(lines, fmt)), chunk_size):
+                rows = _validate(kind, chunk, on_conflict, result)
+                touched: List[str] = []
+                if rows:
+                    _load(conn, staging, rows)
+                    if kind is ImportKind.PROJECTS:
+                        touched = _merge_projects(conn, on_conflict, len(rows), result)
+                    else:
+                        _merge_tasks(conn, result)
+                    conn.execute(delete(staging))
+                conn.commit()
+                cache.entity_cache.delete(*touched)
+                result.rows += len(chunk)
+                result.seconds = time.perf_counter() - started
+                result.rows_per_second = result.rows / result.seconds if result.seconds else 0.0
+                if progress:
+                    progress(result)
+        finally:
+            conn.rollback()
+            staging.drop(conn, checkfirst=True)
+            conn.commit()
+    return result
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _fail(result: schemas.ImportResult, index: int, detail: str) -> None:
+    result.failed += 1
+    if len(result.errors) < MAX_REPORTED_ERRORS:
+        result.errors.append(schemas.BulkItemError(index=index, detail=detail))
+
+
+def _validate(
+    kind: ImportKind, chunk: List[Tuple[int, object]], on_conflict: OnConflict, result: schemas.ImportResult
+) -> List[dict]:
+    model = schemas.ProjectCreate if kind is ImportKind.PROJECTS else schemas.TaskImport
+    rows = []
+    for index, record in chunk:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            item: BaseModel = model.parse_obj(record)
+        except (csv.Error, TypeError, ValueError) as exc:  # pydantic's ValidationError included
+            _fail(result, index, str(exc))
+            continue
+        row = {"line": index, **item.dict()}
+        if kind is ImportKind.TASKS:
+            row["status"] = item.status.value
+        rows.append(row)
+    if kind is ImportKind.PROJECTS:
+        rows = _dedupe_names(rows, on_conflict, result)
+    return rows
+
+
+def _dedupe_names(rows: List[dict], on_conflict: OnConflict, result: schemas.ImportResult) -> List[dict]:
+    """One row per name and chunk (an upsert cannot touch a row twice): first or last wins."""
+    by_name = {}
+    for row in rows:
+        if row["name"] in by_name:
+            result.skipped += 1
+            if on_conflict is OnConflict.SKIP:
+                continue
+        by_name[row["name"]] = row
+    return list(by_name.values())
+
+
+def _load(conn: Connection, staging: Table, rows: List[dict]) -> None:
+    if conn.dialect.driver == "psycopg2":
+        _copy(conn, staging, rows)
+    else:
+        conn.execute(insert(staging), [{column.name: row.get(column.name) for column in staging.columns} for row in rows])
+
+
+def _copy(conn: Connection, staging: Table, rows: List[dict]) -> None:
+    columns = [column.name for column in staging.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([COPY_NULL if row.get(column) is None else row[column] for column in columns])
+    buffer.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {staging.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def _merge_projects(
+    conn: Connection, on_conflict: OnConflict, staged: int, result: schemas.ImportResult
+) -> List[str]:
+    staging = PROJECT_STAGING
+    now = literal(datetime.utcnow(), DateTime)
+    stmt = UPSERTS[conn.dialect.name](models.Project).from_select(
+        ["name", "description", "created_at", "updated_at"],
+        # The WHERE keeps SQLite from parsing ON CONFLICT as a join constraint.
+        select(staging.c.name, staging.c.description, now, now)
+        .where(staging.c.name.is_not(None))
+        .order_by(staging.c.line),
+    )
+    if on_conflict is OnConflict.UPDATE:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"description": stmt.excluded.description, "updated_at": stmt.excluded.updated_at},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["name"])
+    ids = conn.execute(stmt.returning(models.Project.id)).scalars().all()
+    result.imported += len(ids)
+    result.skipped += staged - len(ids)
+    return [cache.project_key(project_id) for project_id in ids]
+
+
+def _merge_tasks(conn: Connection, result: schemas.ImportResult) -> None:
+    staging = TASK_STAGING
+    project = models.Project
+    conn.execute(
+        update(staging)
+        .where(staging.c.project_id.is_(None))
+        .values(project_id=select(project.id).where(project.name == staging.c.project_name).scalar_subquery())
+    )
+    # Projects awaiting purge count as missing.
+    has_project = exists().where(project.id == staging.c.project_id, project.deleted_at.is_(None))
+    for line, project_id, project_name in conn.execute(
+        select(staging.c.line, staging.c.project_id, staging.c.project_name)
+        .where(~has_project)
+        .order_by(staging.c.line)
+    ):
+        _fail(result, line, f"Project {project_name if project_name is not None else project_id} not found")
+
+    status = cast(staging.c.status, models.Task.status.type)
+    now = literal(datetime.utcnow(), DateTime)
+    inserted = conn.execute(
+        insert(models.Task).from_select(
+            ["title", "description", "status", "priority", "due_date", "project_id", "created_at", "updated_at"],
+            select(
+                staging.c.title,
+                staging.c.description,
+                status,
+                staging.c.priority,
+                staging.c.due_date,
+                staging.c.project_id,
+                now,
+                now,
+            )
+            .where(has_project)
+            .order_by(staging.c.line),
+        )
+    )
+    result.imported += inserted.rowcount
+
+    counts = (
+        select(staging.c.project_id, status, staging.c.priority, func.count())
+        .where(has_project)
+        .group_by(staging.c.project_id, staging.c.status, staging.c.priority)
+        # Same key order as `crud._bump_counters`, so concurrent writers lock rows alike.
+        .order_by(staging.c.project_id, staging.c.status, staging.c.priority)
+    )
+    upsert = UPSERTS[conn.dialect.name](models.TaskCounter).from_select(
+        ["project_id", "status", "priority", "count"], counts
+    )
+    conn.execute(
+        upsert.on_conflict_do_update(
+            index_elements=["project_id", "status", "priority"],
+            set_={"count": models.TaskCounter.count + upsert.excluded["count"]},
+        )
+    )
+
+
+def _print_progress(result: schemas.ImportResult) -> None:
+    print(
+        f"{result.rows} rows: {result.imported} imported, {result.skipped} skipped, "
+        f"{result.failed} failed ({result.rows_per_second:,.0f} rows/s)",
+        file=sys.stderr,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .database import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.importer", description=__doc__.splitlines()[0])
+    parser.add_argument("kind", choices=[kind.value for kind in ImportKind])
+    parser.add_argument("path", help="CSV or NDJSON file, '-' for stdin")
+    parser.add_argument(
+        "--format", choices=[fmt.value for fmt in DataFormat], help="default: from the file extension"
+    )
+    parser.add_argument("--on-conflict", choices=[choice.value for choice in OnConflict], default="skip")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = DataFormat(args.format or ("csv" if args.path.endswith(".csv") else "ndjson"))
+    source = (
+        contextlib.nullcontext(sys.stdin)
+        if args.path == "-"
+        else open(args.path, newline="", encoding="utf-8")
+    )
+    with source as lines:
+        result = run_import(
+            engine,
+            lines,
+            ImportKind(args.kind),
+            fmt,
+            OnConflict(args.on_conflict),
+            args.chunk_size,
+            progress=_print_progress,
+        )
+    print(result.json(indent=2))
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,54 +1,177 @@
 """FastAPI entrypoint for the Task Management backend."""
-from fastapi import Depends, FastAPI, HTTPException, status
+import functools
+import io
+import tempfile
+from datetime import date
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.orm import Session
 
-from . import crud, models, schemas
-from .database import Base, engine, get_db
-
-app = FastAPI(title="Task Management API", version="1.0.0")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from . import (
+    admission,
+    async_crud,
+    cache,
+    crud,
+    database,
+    etags,
+    export,
+    importer,
+    models,
+    purge,
+    schemas,
+    serialization,
+    telemetry,
+)
+from .admission import AdmissionControlMiddleware
+from .compression import CompressionMiddleware
+from .database import (
+    ASYNC_MODE,
+    Base,
+    Database,
+    SessionLocal,
+    engine,
+    get_async_read_session,
+    get_async_session,
+    get_db,
+    get_read_session,
+    get_session,
 )
+from .models import TaskStatus
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    CursorExpired,
+    InvalidCursor,
+    set_next_cursor,
+    split_page,
+)
+from .replicas import ReadYourWritesMiddleware
+from .telemetry import RequestMetricsMiddleware
+
+router = APIRouter()
 
 
-@app.post("/projects", response_model=schemas.ProjectOut, status_code=status.HTTP_201_CREATED)
-def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
+@router.post("/projects", response_model=schemas.ProjectOut, status_code=status.HTTP_201_CREATED)
+async def create_project(project: schemas.ProjectCreate, db: Database = Depends(get_session)):
     try:
-        return crud.create_project(db, project)
+        return await db.run(crud.create_project, project)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Project with the same name already exists"
         )
 
 
-@app.get("/projects", response_model=list[schemas.ProjectOut])
-def list_projects(db: Session = Depends(get_db)):
-    return crud.list_projects(db)
+@router.get("/projects", response_model=list[schemas.ProjectOut])
+async def list_projects(
+    request: Request,
+    response: Response,
+    ids: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    if_none_match: str | None = Header(None),
+    db: Database = Depends(get_read_session),
+):
+    """`ids=1,2,3` looks projects up by id instead (see `POST /projects/batch-get`)."""
+    if ids:
+        return _found(response, *await db.run(crud.get_projects_by_ids, _parse(schemas.parse_ids, ids)))
+    etag = etags.make_etag("projects", request.url.query, *await db.run(crud.projects_fingerprint))
+    if etags.matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    fast = serialization.FAST_SERIALIZATION
+    list_page = crud.list_project_rows if fast else crud.list_projects
+    items, next_cursor = split_page(await db.run(list_page, limit=limit + 1, cursor=cursor), limit)
+    if fast:
+        # Skips response_model validation; the declared model still documents the body.
+        response = serialization.json_response(serialization.encode_projects(items))
+    set_next_cursor(response, next_cursor)
+    response.headers.update(etags.cache_headers(etag))
+    return response if fast else items
 
 
-@app.get("/projects/{project_id}", response_model=schemas.ProjectOut)
-def get_project(project_id: int, db: Session = Depends(get_db)):
+@router.get("/projects/{project_id}", response_model=schemas.ProjectOut | schemas.ProjectWithTasks)
+async def get_project(
+    project_id: int,
+    response: Response,
+    include: str | None = Query(None, pattern="^tasks$"),
+    task_status: list[TaskStatus] | None = Query(None, alias="status"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    if_none_match: str | None = Header(None),
+    db: Database = Depends(get_read_session),
+):
+    """`include=tasks` embeds a page of the project's tasks (filtered by `status`), fetched with it."""
     try:
-        return crud.get_project(db, project_id)
+        if include:
+            project, tasks = await db.run(
+                crud.get_project_with_tasks, project_id, limit=limit + 1, cursor=cursor, statuses=task_status
+            )
+            return _project_with_tasks(project, tasks, limit)
+        if if_none_match:
+            etag = etags.project_etag(project_id, await db.run(crud.project_version, project_id))
+            if etags.matches(if_none_match, etag):
+                return etags.not_modified(etag)
+        project = await db.run(crud.get_project, project_id)
     except NoResultFound as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+    response.headers.update(etags.cache_headers(etags.project_etag(project.id, project.updated_at)))
+    return project
 
 
-@app.put("/projects/{project_id}", response_model=schemas.ProjectOut)
-def update_project(project_id: int, project: schemas.ProjectUpdate, db: Session = Depends(get_db)):
+def _parse(parse, value: str):
+    """Run a query value parser; its ValueError becomes a 422."""
     try:
-        return crud.update_project(db, project_id, project)
+        return parse(value)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+
+def _found(response: Response, items: list, missing: list[int]) -> list:
+    if missing:
+        response.headers["X-Missing-Ids"] = ",".join(map(str, missing))
+    return items
+
+
+def _project_with_tasks(project, tasks, limit: int) -> JSONResponse:
+    # Built here rather than by `response_model`, which would pick the plain project shape.
+    items, next_cursor = split_page(tasks, limit)
+    payload = schemas.ProjectWithTasks(**schemas.ProjectOut.from_orm(project).dict(), tasks=items)
+    response = JSONResponse(jsonable_encoder(payload))
+    set_next_cursor(response, next_cursor)
+    return response
+
+
+@router.post("/projects/batch-get", response_model=schemas.ProjectBatchResult)
+async def batch_get_projects(batch: schemas.BatchGet, db: Database = Depends(get_session)):
+    items, missing = await db.run(crud.get_projects_by_ids, batch.ids)
+    return {"items": items, "missing": missing}
+
+
+@router.put("/projects/{project_id}", response_model=schemas.ProjectOut)
+async def update_project(
+    project_id: int, project: schemas.ProjectUpdate, db: Database = Depends(get_session)
+):
+    try:
+        return await db.run(crud.update_project, project_id, project)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Project with the same name already exists"
         )
@@ -56,52 +179,247 @@ def update_project(project_id: int, project: schemas.ProjectUpdate, db: Session
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
 
 
-@app.delete("/projects/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(project_id: int, db: Session = Depends(get_db)):
+@router.delete("/projects/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_project(project_id: int, db: Database = Depends(get_session)):
+    try:
+        if await db.run(crud.delete_project, project_id):
+            purge.wake()
+    except NoResultFound as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+
+
+@router.get("/projects/{project_id}/metrics", response_model=schemas.TaskMetrics)
+async def get_project_metrics(project_id: int, db: Database = Depends(get_read_session)):
+    try:
+        return await db.run(crud.get_task_metrics, project_id)
+    except NoResultFound as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Request, SQL and pool metrics in the Prometheus text format."""
+    body = telemetry.render_prometheus() + "\n".join(admission.render_prometheus()) + "\n"
+    return PlainTextResponse(body, media_type=telemetry.PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/metrics/tasks", response_model=schemas.TaskMetrics)
+async def get_task_metrics(db: Database = Depends(get_read_session)):
+    return await db.run(crud.get_task_metrics)
+
+
+@router.get("/metrics/pool", response_model=dict[str, schemas.PoolStats])
+async def get_pool_metrics():
+    # async so it keeps answering when the threadpool is saturated by blocked DB calls.
+    return {name: monitor.snapshot() for name, monitor in telemetry.POOL_MONITORS.items()}
+
+
+@router.get("/metrics/admission", response_model=dict[str, schemas.AdmissionStats])
+async def get_admission_metrics():
+    return {name: budget.snapshot() for name, budget in admission.BUDGETS.items()}
+
+
+@router.get("/metrics/cache", response_model=schemas.CacheStats)
+async def get_cache_metrics():
+    return cache.entity_cache.stats()
+
+
+@router.get("/sync", response_model=schemas.SyncResult)
+async def sync_changes(
+    cursor: str | None = Query(None, alias="since"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Database = Depends(get_session),  # the primary: replica lag could outrun SYNC_SETTLE_SECONDS
+):
+    """Changes since the `cursor` of the previous response; omit `since` for a full sync."""
+    return await db.run(crud.get_changes, cursor, limit)
+
+
+@router.post("/tasks", response_model=schemas.TaskOut, status_code=status.HTTP_201_CREATED)
+async def create_task(task: schemas.TaskCreate, db: Database = Depends(get_session)):
     try:
-        crud.delete_project(db, project_id)
+        return await db.run(crud.create_task, task)
     except NoResultFound as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
 
 
-@app.post("/tasks", response_model=schemas.TaskOut, status_code=status.HTTP_201_CREATED)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
+@router.post("/tasks/bulk", response_model=schemas.TaskBulkResult)
+async def bulk_create_tasks(
+    tasks: schemas.TaskBulkCreate = Body(...), db: Database = Depends(get_session)
+):
+    return await db.run(crud.bulk_create_tasks, tasks)
+
+
+@router.patch("/tasks/bulk", response_model=schemas.TaskBulkUpdateResult)
+async def bulk_update_tasks(bulk: schemas.TaskBulkUpdate, db: Database = Depends(get_session)):
     try:
-        return crud.create_task(db, task)
+        return await db.run(crud.bulk_update_tasks, bulk)
     except NoResultFound as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
 
 
-@app.get("/tasks", response_model=list[schemas.TaskOut])
-def list_tasks(project_id: int | None = None, db: Session = Depends(get_db)):
-    return crud.list_tasks(db, project_id)
+@router.post("/import", response_model=schemas.ImportResult)
+async def import_data(
+    request: Request,
+    kind: importer.ImportKind,
+    format: export.DataFormat = export.DataFormat.NDJSON,
+    on_conflict: importer.OnConflict = importer.OnConflict.SKIP,
+    db: Session = Depends(get_db),  # COPY needs the psycopg2 engine, in either mode
+):
+    """Raw CSV/NDJSON body; spooled to disk past 8 MB, then imported off the event loop."""
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        async with admission.admitted(request):  # a write slot for the import, not the upload
+            return await run_in_threadpool(
+                importer.run_import, db.get_bind(), lines, kind, format, on_conflict
+            )
+
 
+@router.post("/tasks/batch-get", response_model=schemas.TaskBatchResult)
+async def batch_get_tasks(batch: schemas.BatchGet, db: Database = Depends(get_session)):
+    items, missing = await db.run(crud.get_tasks_by_ids, batch.ids)
+    return {"items": items, "missing": missing}
 
-@app.get("/tasks/{task_id}", response_model=schemas.TaskOut)
-def get_task(task_id: int, db: Session = Depends(get_db)):
+
+@router.get("/tasks", response_model=list[schemas.TaskOut])
+async def list_tasks(
+    request: Request,
+    response: Response,
+    project_id: int | None = None,
+    status: list[TaskStatus] | None = Query(None),
+    priority_min: int | None = Query(None, ge=1, le=5),
+    priority_max: int | None = Query(None, ge=1, le=5),
+    due_from: date | None = None,
+    due_to: date | None = None,
+    overdue: bool = False,
+    sort: str = Query("-created_at", pattern=crud.TASK_SORT_PATTERN),
+    ids: str | None = None,
+    fields: str | None = Query(None, description="Comma-separated TaskOut fields, e.g. id,title,status"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    if_none_match: str | None = Header(None),
+    db: Database = Depends(get_read_session),
+):
+    if ids:
+        # A lookup by id; filters and pagination do not apply.
+        return _found(response, *await db.run(crud.get_tasks_by_ids, _parse(schemas.parse_ids, ids)))
+    selected = _parse(serialization.parse_fields, fields) if fields else serialization.TASK_OUT_FIELDS
+    # Filters only narrow the result, so the (project-wide) fingerprint still covers it; `overdue`
+    # also depends on the date, which turns over without any write.
+    fingerprint = await db.run(crud.tasks_fingerprint, project_id)
+    etag = etags.make_etag("tasks", request.url.query, *fingerprint, crud.today() if overdue else "")
+    if etags.matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    fast = serialization.FAST_SERIALIZATION or bool(fields)
+    list_page = crud.list_tasks
+    if fast:
+        list_page = functools.partial(crud.list_task_rows, fields=selected)
+    rows = await db.run(
+        list_page,
+        project_id,
+        limit=limit + 1,
+        cursor=cursor,
+        statuses=status,
+        priority_min=priority_min,
+        priority_max=priority_max,
+        due_from=due_from,
+        due_to=due_to,
+        overdue=overdue,
+        sort=sort,
+    )
+    items, next_cursor = split_page(rows, limit, key=crud.sort_key(sort))
+    if fast:
+        response = serialization.json_response(serialization.encode_tasks(items, selected))
+    set_next_cursor(response, next_cursor)
+    response.headers.update(etags.cache_headers(etag))
+    return response if fast else items
+
+
+@router.get("/tasks/search", response_model=list[schemas.TaskOut])
+async def search_tasks(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    project_id: int | None = None,
+    status: TaskStatus | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: Database = Depends(get_read_session),
+):
+    rows = await db.run(crud.search_tasks, q, project_id, status, limit=limit + 1, cursor=cursor)
+    items, next_cursor = split_page(rows, limit, key=lambda row: (row.rank, row.Task.id))
+    set_next_cursor(response, next_cursor)
+    return [row.Task for row in items]
+
+
+@router.get("/tasks/export", response_class=StreamingResponse)
+async def export_tasks(
+    format: export.DataFormat = export.DataFormat.NDJSON,
+    project_id: int | None = None,
+    db: Database = Depends(get_read_session),
+):
+    if db.is_async:
+        body = export.astream(async_crud.stream_task_rows(db.session.bind, project_id), format)
+    else:
+        body = export.stream(crud.stream_task_rows(db.session.get_bind(), project_id), format)
+    return StreamingResponse(
+        body,
+        media_type=export.MEDIA_TYPES[format],
+        headers=export.content_disposition(format),
+    )
+
+
+@router.get("/tasks/{task_id}", response_model=schemas.TaskOut)
+async def get_task(
+    task_id: int,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: Database = Depends(get_read_session),
+):
     try:
-        return crud.get_task(db, task_id)
+        if if_none_match:
+            etag = etags.task_etag(task_id, *await db.run(crud.task_version, task_id))
+            if etags.matches(if_none_match, etag):
+                return etags.not_modified(etag)
+        task = await db.run(crud.get_task, task_id)
     except NoResultFound as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+    etag = etags.task_etag(task.id, task.updated_at, task.project.updated_at)
+    response.headers.update(etags.cache_headers(etag))
+    return task
 
 
-@app.put("/tasks/{task_id}", response_model=schemas.TaskOut)
-def update_task(task_id: int, task: schemas.TaskUpdate, db: Session = Depends(get_db)):
+@router.put("/tasks/{task_id}", response_model=schemas.TaskOut)
+async def update_task(task_id: int, task: schemas.TaskUpdate, db: Database = Depends(get_session)):
     try:
-        return crud.update_task(db, task_id, task)
+        return await db.run(crud.update_task, task_id, task)
     except NoResultFound as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
 
 
-@app.delete("/tasks/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_task(task_id: int, db: Session = Depends(get_db)):
+@router.delete("/tasks/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_task(task_id: int, db: Database = Depends(get_session)):
     try:
-        crud.delete_task(db, task_id)
+        await db.run(crud.delete_task, task_id)
     except NoResultFound as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
 
 
-@app.exception_handler(NoResultFound)
+def handle_invalid_cursor(_, exc: InvalidCursor):
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": str(exc)},
+    )
+
+
+def handle_expired_cursor(_, exc: CursorExpired):
+    return JSONResponse(
+        status_code=status.HTTP_410_GONE,
+        content={"detail": str(exc)},
+    )
+
+
 def handle_not_found(_, exc: NoResultFound):
     return JSONResponse(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -109,9 +427,48 @@ def handle_not_found(_, exc: NoResultFound):
     )
 
 
-@app.on_event("startup")
-def ensure_models_exist() -> None:
-    """Create tables when a database is available (skipped in tests)."""
-    if getattr(app.state, "skip_db_init", False):
-        return
-    Base.metadata.create_all(bind=engine)
+def create_app(async_mode: bool = ASYNC_MODE) -> FastAPI:
+    """Build the API; async mode serves the same routes on AsyncSession-backed dependencies."""
+    app = FastAPI(title="Task Management API", version="1.0.0")
+
+    if admission.ADMISSION_CONTROL:
+        app.add_middleware(AdmissionControlMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Missing-Ids", "X-Read-Primary-Until", "ETag"],
+    )
+    app.add_middleware(ReadYourWritesMiddleware, enabled=lambda: bool(database.replica_router))
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(RequestMetricsMiddleware)
+
+    if async_mode:
+        app.dependency_overrides[get_session] = get_async_session
+        app.dependency_overrides[get_read_session] = get_async_read_session
+    app.include_router(router)
+    app.add_exception_handler(InvalidCursor, handle_invalid_cursor)
+    app.add_exception_handler(CursorExpired, handle_expired_cursor)
+    app.add_exception_handler(NoResultFound, handle_not_found)
+
+    @app.on_event("startup")
+    def ensure_models_exist() -> None:
+        """Create tables when a database is available (skipped in tests)."""
+        if getattr(app.state, "skip_db_init", False):
+            return
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            if db.execute(select(models.TaskCounter.project_id).limit(1)).first() is None:
+                crud.rebuild_task_counters(db)
+        purge.start(SessionLocal)
+
+    @app.on_event("shutdown")
+    def stop_workers() -> None:
+        purge.stop()
+
+    return app
+
+
+app = create_app()
@@ -2,31 +2,98 @@
 import enum
 from datetime import datetime, date
 
-from sqlalchemy import Column, Date, DateTime, Enum, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Computed,
+    Date,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy.schema import CreateColumn
 
 from .database import Base
 
 
+# Text search configuration for `Task.search_vector`; "simple" neither stems nor drops
+# stop words, so it behaves the same for Spanish and English content.
+SEARCH_CONFIG = "simple"
+
+
 class TaskStatus(str, enum.Enum):
     TODO = "TODO"
     IN_PROGRESS = "IN_PROGRESS"
     DONE = "DONE"
 
 
+class DeletedEntity(str, enum.Enum):
+    PROJECT = "project"
+    TASK = "task"
+
+
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_created_at_id", "created_at", "id"),
+        Index("ix_projects_updated_at", "updated_at"),
+        # The few projects awaiting purge; every task read excludes them.
+        Index(
+            "ix_projects_pending_purge",
+            "id",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, nullable=False, index=True)
     description = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Set when a large project is deleted; its rows are removed later by the purge worker.
+    deleted_at = Column(DateTime, nullable=True)
 
-    tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
+    # passive_deletes: the ON DELETE CASCADE foreign key removes tasks, the session never loads them.
+    tasks = relationship(
+        "Task", back_populates="project", cascade="all, delete-orphan", passive_deletes=True
+    )
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Keyset pagination: one index range scan per page, with and without a project filter.
+        Index("ix_tasks_project_id_created_at_id", "project_id", "created_at", "id"),
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        # Board columns: one project's tasks in one status, newest first.
+        Index("ix_tasks_project_id_status_created_at_id", "project_id", "status", "created_at", "id"),
+        # The other `list_tasks` sorts within a project (forward or backward scans).
+        Index("ix_tasks_project_id_priority_id", "project_id", "priority", "id"),
+        Index("ix_tasks_project_id_due_date_id", "project_id", "due_date", "id"),
+        # Sorting by updated_at, and max(updated_at) fingerprints for list ETags.
+        Index("ix_tasks_updated_at_id", "updated_at", "id"),
+        Index("ix_tasks_project_id_updated_at_id", "project_id", "updated_at", "id"),
+        # Overdue counts and `overdue=true` lists only ever look at open tasks with a due date.
+        Index(
+            "ix_tasks_open_due_date",
+            "due_date",
+            "project_id",
+            postgresql_where=text("status <> 'DONE' AND due_date IS NOT NULL"),
+            sqlite_where=text("status <> 'DONE' AND due_date IS NOT NULL"),
+        ),
+        # Full-text search; Postgres only, like the column it indexes.
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(150), nullable=False)
@@ -37,5 +104,58 @@ class Task(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    # Maintained by Postgres; deferred so regular task reads never fetch it.
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', title), 'A') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        )
+    )
 
     project = relationship("Project", back_populates="tasks")
+
+    # Computed columns are fetched lazily rather than via RETURNING after each flush.
+    __mapper_args__ = {"eager_defaults": False}
+
+
+@compiles(CreateColumn, "sqlite")
+def _skip_search_vector(element, compiler, **kw):
+    """SQLite (unit tests) has no full-text types: leave the column out of its DDL."""
+    if element.element.name == "search_vector":
+        return None
+    return compiler.visit_create_column(element, **kw)
+
+
+@compiles(TSVECTOR, "sqlite")
+def _tsvector_on_sqlite(element, compiler, **kw):
+    return "TEXT"
+
+
+class TaskCounter(Base):
+    """Task totals per (project, status, priority), maintained by the CRUD write paths."""
+
+    __tablename__ = "task_counters"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(Enum(TaskStatus), primary_key=True)
+    priority = Column(Integer, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class Deletion(Base):
+    """Tombstones for `GET /sync`: ids of deleted tasks and projects, pruned after a while.
+
+    Tasks removed with their project are not logged; the project's tombstone covers them.
+    """
+
+    __tablename__ = "deletions"
+    __table_args__ = (Index("ix_deletions_deleted_at_id", "deleted_at", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(Enum(DeletedEntity), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
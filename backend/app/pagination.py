@@ -0,0 +1,72 @@
+"""Opaque keyset cursors over `(sort key, id)`; the sort key defaults to `created_at`."""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import Response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+Cursor = Tuple[Any, int]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue."""
+
+
+class CursorExpired(InvalidCursor):
+    """Raised for a sync cursor older than the retained deletion log."""
+
+
+def encode_cursor(key, row_id: int) -> str:
+    value = key.isoformat() if isinstance(key, date) else key
+    raw = json.dumps([value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_type: Callable = datetime) -> Cursor:
+    """`key_type` is the sort key's Python type: `datetime` (default), `date`, `int`, `float`.
+
+    A null sort key (e.g. a task without due date) decodes to None.
+    """
+    parse = key_type.fromisoformat if key_type in (date, datetime) else key_type
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (None if key is None else parse(key)), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise InvalidCursor("Invalid pagination cursor") from exc
+
+
+def encode_cursors(positions: Sequence[Cursor]) -> str:
+    """Several keyset positions (e.g. one per `GET /sync` stream) as one opaque cursor."""
+    return ".".join(encode_cursor(*position) for position in positions)
+
+
+def decode_cursors(cursor: str, count: int, key_type: Callable = datetime) -> List[Cursor]:
+    parts = cursor.split(".")
+    if len(parts) != count:
+        raise InvalidCursor("Invalid sync cursor")
+    return [decode_cursor(part, key_type) for part in parts]
+
+
+def _created_at_key(item) -> Cursor:
+    return item.created_at, item.id
+
+
+def split_page(
+    rows: Sequence, limit: int, key: Callable[[Any], Cursor] = _created_at_key
+) -> Tuple[List, Optional[str]]:
+    """Trim a `limit + 1` fetch to `limit` rows and build the cursor for the next page."""
+    items = list(rows[:limit])
+    if len(rows) <= limit:
+        return items, None
+    return items, encode_cursor(*key(items[-1]))
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
@@ -0,0 +1,82 @@
+"""Background purge of projects that `crud.delete_project` marked deleted, and of old sync tombstones."""
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from . import crud
+
+# Seconds between passes; `wake()` starts one right away.
+PURGE_INTERVAL = float(os.getenv("PURGE_INTERVAL", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+class PurgeWorker:
+    """Daemon thread running `crud.purge_deleted_projects` on its own sessions."""
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float = PURGE_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="project-purge", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Let the current chunk commit, then end the thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def run_once(self) -> int:
+        with self.session_factory() as db:
+            crud.prune_deletions(db)
+            return crud.purge_deleted_projects(db)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                purged = self.run_once()
+                if purged:
+                    logger.info("Purged %d tasks of deleted projects", purged)
+            except Exception:  # keep the worker alive; the next pass resumes where this one stopped
+                logger.exception("Project purge failed")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+worker: Optional[PurgeWorker] = None
+
+
+def start(session_factory: Callable[[], Session]) -> None:
+    """Start the process-wide worker (app startup)."""
+    global worker
+    if worker is None:
+        worker = PurgeWorker(session_factory)
+    worker.start()
+
+
+def stop() -> None:
+    if worker is not None:
+        worker.stop()
+
+
+def wake() -> None:
+    """Called after a deferred project delete; a no-op when no worker runs (tests, CLI)."""
+    if worker is not None:
+        worker.wake()
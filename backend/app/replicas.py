@@ -0,0 +1,104 @@
+"""Read replica selection and the read-your-writes escape hatch.
+
+Read-only routes get a session on a replica picked round-robin; writes stay on the
+primary. A client that needs its own writes back reads from the primary for
+REPLICA_STICKY_SECONDS after any write, or for a single request by sending
+`X-Read-Primary: 1`. Writes return the deadline both as a cookie and in the
+`X-Read-Primary-Until` header; cross-origin clients, whose requests carry no cookies,
+echo that header back on their reads.
+"""
+import math
+import os
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Callable, Dict, Optional, Sequence
+
+from sqlalchemy.engine import Engine
+
+# Seconds a failed replica is skipped before it is tried again.
+REPLICA_RETRY_AFTER = float(os.getenv("REPLICA_RETRY_AFTER", "30"))
+# Seconds after a write during which the same client reads from the primary; covers replica lag.
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_PRIMARY_HEADER = "x-read-primary"
+READ_PRIMARY_UNTIL_HEADER = "x-read-primary-until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaRouter:
+    """Round-robin over replica engines, skipping any that failed in the last `retry_after` seconds."""
+
+    def __init__(
+        self,
+        engines: Sequence[Engine],
+        retry_after: float = REPLICA_RETRY_AFTER,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engines = list(engines)
+        self.retry_after = retry_after
+        self._clock = clock
+        self._next = 0
+        self._down_until: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def pick(self) -> Optional[Engine]:
+        """Next healthy replica, or None when every replica is down."""
+        with self._lock:
+            now = self._clock()
+            for _ in range(len(self.engines)):
+                index = self._next
+                self._next = (self._next + 1) % len(self.engines)
+                if self._down_until.get(index, 0.0) <= now:
+                    return self.engines[index]
+            return None
+
+    def mark_down(self, engine: Engine) -> None:
+        with self._lock:
+            self._down_until[self.engines.index(engine)] = self._clock() + self.retry_after
+
+
+def wants_primary(headers: Dict[str, str], cookies: Dict[str, str]) -> bool:
+    """True when the client asked for primary reads or wrote within the sticky window."""
+    if headers.get(READ_PRIMARY_HEADER) == "1":
+        return True
+    for until in (headers.get(READ_PRIMARY_UNTIL_HEADER), cookies.get(READ_PRIMARY_COOKIE)):
+        try:
+            if until and float(until) > time.time():
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+class ReadYourWritesMiddleware:
+    """Sets the sticky-primary cookie and header on successful writes while replicas are in use."""
+
+    def __init__(self, app, enabled: Callable[[], bool]):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not self.enabled():
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = f"{time.time() + REPLICA_STICKY_SECONDS:.3f}"
+                cookie = SimpleCookie()
+                cookie[READ_PRIMARY_COOKIE] = until
+                cookie[READ_PRIMARY_COOKIE]["max-age"] = math.ceil(REPLICA_STICKY_SECONDS)
+                cookie[READ_PRIMARY_COOKIE]["path"] = "/"
+                cookie[READ_PRIMARY_COOKIE]["httponly"] = True
+                cookie[READ_PRIMARY_COOKIE]["samesite"] = "Lax"
+                header = cookie.output(header="").strip().encode("latin-1")
+                headers = [(b"set-cookie", header), (READ_PRIMARY_UNTIL_HEADER.encode(), until.encode())]
+                message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
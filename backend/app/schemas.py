@@ -1,8 +1,8 @@
 """Pydantic schemas for request and response validation."""
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, conlist, root_validator, validator
 
 from .models import TaskStatus
 
@@ -24,6 +24,7 @@ class ProjectUpdate(BaseModel):
 class ProjectOut(ProjectBase):
     id: int
     created_at: datetime
+    updated_at: datetime
 
     class Config:
         orm_mode = True
@@ -46,6 +47,11 @@ class TaskCreate(TaskBase):
     pass
 
 
+BULK_MAX_ITEMS = 10_000
+
+TaskBulkCreate = conlist(TaskCreate, min_items=1, max_items=BULK_MAX_ITEMS)
+
+
 class TaskUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=3, max_length=150)
     description: Optional[str] = Field(None, max_length=1000)
@@ -58,6 +64,13 @@ class TaskUpdate(BaseModel):
     def title_trim(cls, value: Optional[str]) -> Optional[str]:
         return value.strip() if value else value
 
+    @validator("title", "status", "priority", "project_id", pre=True)
+    def not_null(cls, value, field):
+        # Omit a field to leave it alone; null would only fail the column's NOT NULL.
+        if value is None:
+            raise ValueError(f"{field.name} may not be null")
+        return value
+
 
 class TaskOut(TaskBase):
     id: int
@@ -69,5 +82,171 @@ class TaskOut(TaskBase):
         orm_mode = True
 
 
+class ProjectTaskOut(TaskBase):
+    """A task embedded in its project: `TaskOut` without the repeated project."""
+
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
 class ProjectWithTasks(ProjectOut):
-    tasks: List[TaskOut] = []
+    tasks: List[ProjectTaskOut] = []
+
+
+BATCH_GET_MAX_IDS = 1000
+
+
+class BatchGet(BaseModel):
+    ids: conlist(int, min_items=1, max_items=BATCH_GET_MAX_IDS)
+
+
+def parse_ids(value: str) -> List[int]:
+    """Comma-separated `ids=` query value; ValueError when malformed or too long."""
+    return BatchGet(ids=value.split(",")).ids
+
+
+class TaskBatchResult(BaseModel):
+    items: List[TaskOut] = []
+    missing: List[int] = []
+
+
+class ProjectBatchResult(BaseModel):
+    items: List[ProjectOut] = []
+    missing: List[int] = []
+
+
+class SyncDeleted(BaseModel):
+    projects: List[int] = []
+    tasks: List[int] = []
+
+
+class SyncResult(BaseModel):
+    """Changes since a `GET /sync` cursor: upsert `projects` and `tasks`, then drop `deleted`.
+
+    A deleted project takes its tasks with it. Keep calling with `cursor` while `has_more`.
+    """
+
+    projects: List[ProjectOut] = []
+    tasks: List[ProjectTaskOut] = []
+    deleted: SyncDeleted = SyncDeleted()
+    cursor: str
+    has_more: bool = False
+
+
+class BulkItemCreated(BaseModel):
+    index: int
+    id: int
+
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class TaskBulkResult(BaseModel):
+    created: List[BulkItemCreated] = []
+    errors: List[BulkItemError] = []
+
+
+class TaskFilter(BaseModel):
+    project_id: Optional[int] = None
+    status: Optional[TaskStatus] = None
+
+    @root_validator(skip_on_failure=True)
+    def not_empty(cls, values):
+        if all(value is None for value in values.values()):
+            raise ValueError("filter needs at least one criterion")
+        return values
+
+
+class TaskBulkUpdate(BaseModel):
+    ids: Optional[conlist(int, min_items=1, max_items=BULK_MAX_ITEMS)] = None
+    filter: Optional[TaskFilter] = None
+    changes: TaskUpdate
+
+    @root_validator(skip_on_failure=True)
+    def one_target(cls, values):
+        if (values.get("ids") is None) == (values.get("filter") is None):
+            raise ValueError("provide exactly one of ids or filter")
+        if not values["changes"].dict(exclude_unset=True):
+            raise ValueError("changes must set at least one field")
+        return values
+
+
+class TaskBulkUpdateResult(BaseModel):
+    updated: List[int] = []
+    missing: List[int] = []
+
+
+class TaskImport(TaskCreate):
+    """Import row: the project is given by id or, for data from other systems, by name."""
+
+    project_id: Optional[int] = None
+    project_name: Optional[str] = Field(None, min_length=3, max_length=100)
+
+    @root_validator(skip_on_failure=True)
+    def one_project(cls, values):
+        if (values.get("project_id") is None) == (values.get("project_name") is None):
+            raise ValueError("provide exactly one of project_id or project_name")
+        return values
+
+
+class ImportResult(BaseModel):
+    rows: int = 0
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[BulkItemError] = []
+    seconds: float = 0.0
+    rows_per_second: float = 0.0
+
+
+class TaskMetrics(BaseModel):
+    total: int
+    by_status: Dict[TaskStatus, int]
+    by_priority: Dict[int, int]
+    overdue: int
+
+
+class HistogramSnapshot(BaseModel):
+    buckets: Dict[str, int]
+    count: int
+    sum: float
+
+
+class PoolStats(BaseModel):
+    pool_size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    connections_opened: int
+    connections_closed: int
+    connections_invalidated: int
+    checkout_wait_seconds: HistogramSnapshot
+
+
+class AdmissionStats(BaseModel):
+    limit: int
+    queue_size: int
+    in_flight: int
+    queue_depth: int
+    admitted: int
+    queued: int
+    rejected_queue_full: int
+    rejected_timeout: int
+    queue_wait_seconds: HistogramSnapshot
+
+
+class CacheStats(BaseModel):
+    backend: str
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
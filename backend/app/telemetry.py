@@ -0,0 +1,327 @@
+"""In-process metrics: histograms, connection pool and per-request instrumentation.
+
+`RequestMetricsMiddleware` times every request by route template and attributes the SQL
+it runs (statement count and time, via cursor execute hooks on every engine) to it.
+`render_prometheus()` renders all of it as Prometheus text for `GET /metrics`. Requests
+slower than SLOW_REQUEST_SECONDS are logged with their statements (never parameters).
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# Upper bounds (seconds) for pool checkout waits; the default pool timeout is 30s.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds for request latency (seconds) and for statements issued per request.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# Requests at least this slow (seconds) are logged with their SQL; 0 disables the log.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+# Statements kept per request for the slow log; the rest are only counted.
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "20"))
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+POOL_MONITORS: Dict[str, "PoolMonitor"] = {}
+POOL_COUNTERS = (
+    "checkouts",
+    "timeouts",
+    "connections_opened",
+    "connections_closed",
+    "connections_invalidated",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+
+class PoolMonitor:
+    """Collects checkout waits, timeouts and connection churn for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.checkout_wait = Histogram(WAIT_BUCKETS)
+        self._counters = dict.fromkeys(POOL_COUNTERS, 0)
+        self._lock = threading.Lock()
+        POOL_MONITORS[name] = self
+
+    def pool_class(self, base: type) -> type:
+        """Subclass `base` so every pool it builds (including after dispose) reports here."""
+        monitor = self
+
+        class MonitoredPool(base):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                # Pool.recreate() hands the old listeners over through `_dispatch`.
+                monitor._watch(self, listen="_dispatch" not in kwargs)
+
+            def connect(self):
+                start = time.perf_counter()
+                try:
+                    return super().connect()
+                except PoolTimeoutError:
+                    monitor._incr("timeouts")
+                    raise
+                finally:
+                    monitor.checkout_wait.observe(time.perf_counter() - start)
+
+        MonitoredPool.__name__ = MonitoredPool.__qualname__ = f"Monitored{base.__name__}"
+        return MonitoredPool
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update(
+            pool_size=pool.size() if pool else 0,
+            checked_out=pool.checkedout() if pool else 0,
+            checked_in=pool.checkedin() if pool else 0,
+            # QueuePool counts overflow from -pool_size; only connections beyond the pool matter.
+            overflow=max(pool.overflow(), 0) if pool else 0,
+            checkout_wait_seconds=self.checkout_wait.snapshot(),
+        )
+        return stats
+
+    def _incr(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _watch(self, pool, listen: bool) -> None:
+        self.pool = pool
+        if not listen:
+            return
+        event.listen(pool, "checkout", lambda *_: self._incr("checkouts"))
+        event.listen(pool, "connect", lambda *_: self._incr("connections_opened"))
+        event.listen(pool, "close", lambda *_: self._incr("connections_closed"))
+        event.listen(pool, "close_detached", lambda *_: self._incr("connections_closed"))
+        event.listen(pool, "invalidate", lambda *_: self._incr("connections_invalidated"))
+
+
+class RequestTrace:
+    """SQL issued on behalf of one request; filled in by the cursor execute hooks."""
+
+    __slots__ = ("queries", "db_seconds", "statements", "_started")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: List[Tuple[float, str]] = []
+        self._started: Optional[float] = None
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.queries += 1
+        trace._started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace.get()
+    if trace is None or trace._started is None:
+        return
+    elapsed = time.perf_counter() - trace._started
+    trace._started = None
+    trace.db_seconds += elapsed
+    if len(trace.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+        trace.statements.append((elapsed, statement))
+
+
+def install_sql_hooks() -> None:
+    """Listen on every Engine (sync drivers and the sync side of async engines) once.
+
+    Sync routes run in the threadpool and async sessions in greenlets; both inherit the
+    request's context, so statements reach the right trace. Outside a request (the purge
+    worker, scripts) the hooks do nothing.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RequestMetrics:
+    """Latency, status and SQL histograms per (method, route template)."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._queries: Dict[Tuple[str, str], Histogram] = {}
+        self._db_seconds: Dict[Tuple[str, str], float] = {}
+        self._responses: Dict[Tuple[str, str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, seconds: float, trace: RequestTrace) -> None:
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+            self._db_seconds[key] = self._db_seconds.get(key, 0.0) + trace.db_seconds
+            self._responses[(method, route, status)] = self._responses.get((method, route, status), 0) + 1
+            latency, queries = self._latency[key], self._queries[key]
+        latency.observe(seconds)
+        queries.observe(trace.queries)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latency.clear()
+            self._queries.clear()
+            self._db_seconds.clear()
+            self._responses.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            in_flight = self.in_flight
+            latency, queries = dict(self._latency), dict(self._queries)
+            db_seconds, responses = dict(self._db_seconds), dict(self._responses)
+        lines = metric_header("http_requests_in_flight", "gauge", "Requests being served.")
+        lines.append(f"http_requests_in_flight {in_flight}")
+        lines += metric_header("http_requests_total", "counter", "Responses by route and status code.")
+        for (method, route, status), count in sorted(responses.items()):
+            labels = format_labels(method=method, route=route, status=status)
+            lines.append(f"http_requests_total{labels} {count}")
+        lines += metric_header("http_request_duration_seconds", "histogram", "Request latency.")
+        for (method, route), histogram in sorted(latency.items()):
+            lines += histogram_lines("http_request_duration_seconds", histogram, method=method, route=route)
+        lines += metric_header("http_request_db_queries", "histogram", "SQL statements per request.")
+        for (method, route), histogram in sorted(queries.items()):
+            lines += histogram_lines("http_request_db_queries", histogram, method=method, route=route)
+        lines += metric_header("http_request_db_seconds_total", "counter", "Time spent in SQL statements.")
+        for (method, route), seconds in sorted(db_seconds.items()):
+            labels = format_labels(method=method, route=route)
+            lines.append(f"http_request_db_seconds_total{labels} {seconds}")
+        return lines
+
+
+REQUEST_METRICS = RequestMetrics()
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI; outermost, so latency covers the whole response including compression."""
+
+    def __init__(self, app, metrics: RequestMetrics = REQUEST_METRICS):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+        status = 500  # unless a response starts before an exception escapes
+        start = time.perf_counter()
+        self.metrics.started()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_trace.reset(token)
+            # The router stores the matched route in the scope; unmatched paths share one label.
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            self.metrics.finished(scope["method"], route, status, elapsed, trace)
+            if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+                _log_slow_request(scope, status, elapsed, trace)
+
+
+def _log_slow_request(scope, status: int, elapsed: float, trace: RequestTrace) -> None:
+    statements = "".join(f"\n  [{seconds * 1000:.1f} ms] {sql}" for seconds, sql in trace.statements)
+    omitted = trace.queries - len(trace.statements)
+    logger.warning(
+        "Slow request %s %s -> %d in %.3fs: %d queries, %.3fs in SQL%s%s",
+        scope["method"],
+        scope["path"],
+        status,
+        elapsed,
+        trace.queries,
+        trace.db_seconds,
+        statements,
+        f"\n  ... {omitted} more" if omitted > 0 else "",
+    )
+
+
+def render_prometheus() -> str:
+    """Request metrics and every pool monitor in the Prometheus text exposition format."""
+    lines = REQUEST_METRICS.render()
+    monitors = sorted(POOL_MONITORS.items())
+    snapshots = [(name, monitor.snapshot()) for name, monitor in monitors]
+    for gauge in ("pool_size", "checked_out", "checked_in", "overflow"):
+        lines += metric_header(f"db_pool_{gauge}", "gauge", f"Connection pool {gauge.replace('_', ' ')}.")
+        lines += [f"db_pool_{gauge}{format_labels(pool=name)} {stats[gauge]}" for name, stats in snapshots]
+    for counter in POOL_COUNTERS:
+        metric = f"db_pool_{counter}_total"
+        lines += metric_header(metric, "counter", f"Connection pool {counter.replace('_', ' ')}.")
+        lines += [f"{metric}{format_labels(pool=name)} {stats[counter]}" for name, stats in snapshots]
+    lines += metric_header("db_pool_checkout_wait_seconds", "histogram", "Connection checkout wait.")
+    for name, monitor in monitors:
+        lines += histogram_lines("db_pool_checkout_wait_seconds", monitor.checkout_wait, pool=name)
+    return "\n".join(lines) + "\n"
+
+
+def metric_header(name: str, kind: str, help_text: str) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def format_labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def histogram_lines(name: str, histogram: Histogram, **labels) -> List[str]:
+    snapshot = histogram.snapshot()
+    lines = [
+        f"{name}_bucket{format_labels(**labels, le=bound)} {count}"
+        for bound, count in snapshot["buckets"].items()
+    ]
+    lines.append(f"{name}_sum{format_labels(**labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{format_labels(**labels)} {snapshot['count']}")
+    return lines
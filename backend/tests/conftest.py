@@ -2,12 +2,38 @@ import os
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from testcontainers.postgres import PostgresContainer
 
-from app.database import Base, get_db
-from app.main import app
+from app import cache, database
+from app.database import Base, get_async_db, get_db
+from app.main import create_app
+from app.replicas import ReplicaRouter
+
+
+@pytest.fixture(autouse=True)
+def clear_entity_cache():
+    """Every test starts from a fresh database, so cached ids would point at stale rows."""
+    cache.entity_cache.clear()
+    yield
+    cache.entity_cache.clear()
+
+
+@pytest.fixture
+def sqlite_session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    # SQLite leaves foreign keys (and so ON DELETE CASCADE) off unless asked.
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+    engine.dispose()
 
 
 @pytest.fixture(scope="session")
@@ -19,6 +45,39 @@ def postgres_url():
         yield url
 
 
+@pytest.fixture(scope="session")
+def replica_url():
+    """A second Postgres standing in for a read replica; tests seed it directly."""
+    image = os.getenv("POSTGRES_IMAGE", "postgres:15")
+    with PostgresContainer(image) as pg:
+        yield pg.get_connection_url().replace("postgresql://", "postgresql+psycopg2://")
+
+
+@pytest.fixture(scope="session")
+def scale_postgres_url():
+    """A separate Postgres for the seeded scale benchmarks, untouched by per-test schema resets."""
+    image = os.getenv("POSTGRES_IMAGE", "postgres:15")
+    with PostgresContainer(image) as pg:
+        yield pg.get_connection_url().replace("postgresql://", "postgresql+psycopg2://")
+
+
+@pytest.fixture
+def replica_engine(replica_url):
+    engine = create_engine(replica_url, future=True)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def replicas(monkeypatch, replica_engine):
+    """Route the API's read-only endpoints to `replica_engine`."""
+    router = ReplicaRouter([replica_engine])
+    monkeypatch.setattr(database, "replica_router", router)
+    return router
+
+
 @pytest.fixture(scope="function")
 def engine(postgres_url):
     engine = create_engine(postgres_url, future=True)
@@ -28,6 +87,27 @@ def engine(postgres_url):
     engine.dispose()
 
 
+@pytest.fixture
+def async_engine(engine, postgres_url):
+    """Async engine on the same database; NullPool keeps connections off other event loops."""
+    return create_async_engine(postgres_url.replace("+psycopg2", "+asyncpg"), poolclass=NullPool)
+
+
+@pytest.fixture
+def query_counter(engine, async_engine):
+    """Collect every SQL statement sent through the test engines."""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", _record)
+    yield statements
+    for target in (engine, async_engine.sync_engine):
+        event.remove(target, "before_cursor_execute", _record)
+
+
 @pytest.fixture
 def session_factory(engine):
     return sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
@@ -40,9 +120,9 @@ def db_session(session_factory):
     session.close()
 
 
-@pytest.fixture
-def client(session_factory):
-    """FastAPI client wired to the disposable database."""
+@pytest.fixture(params=["sync", "async"])
+def client(request, session_factory):
+    """FastAPI client wired to the disposable database, once per engine mode."""
     def _get_test_db():
         db = session_factory()
         try:
@@ -50,8 +130,19 @@ def client(session_factory):
         finally:
             db.close()
 
+    app = create_app(async_mode=request.param == "async")
     app.state.skip_db_init = True
     app.dependency_overrides[get_db] = _get_test_db
+    if request.param == "async":
+        async_factory = async_sessionmaker(
+            bind=request.getfixturevalue("async_engine"), autoflush=False, expire_on_commit=False
+        )
+
+        async def _get_test_async_db():
+            async with async_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = _get_test_async_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
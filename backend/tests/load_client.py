@@ -0,0 +1,350 @@
+"""Concurrent load generator for a running API (the same `E2E_BASE_URL` target as the E2E tests).
+
+    python tests/load_client.py --duration 30 --concurrency 50 --output before.json
+    python tests/load_client.py --rate 200 --mix list_tasks=5,get_task=3,create_task=1
+
+With `--concurrency` alone, that many workers send requests back to back (closed loop),
+which finds the saturation point. With `--rate`, requests start on a fixed schedule
+(open loop, at most `--concurrency` in flight) and latency is measured from the
+scheduled start, so a stalled server shows up as latency instead of a lower send rate.
+
+Each run seeds its own projects and tasks, picks operations from the weighted mix (a
+delete that would go below one task per project is skipped, not sent), and writes a JSON report: throughput, error rate, status codes and p50/p95/p99 latency per
+operation and overall, so reports from two builds can be diffed. The seeded projects
+are deleted afterwards unless `--keep` is given.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+import httpx
+
+DEFAULT_MIX = {
+    "list_tasks": 4,
+    "filter_tasks": 2,
+    "get_task": 4,
+    "list_projects": 1,
+    "get_project": 1,
+    "create_task": 2,
+    "update_task": 2,
+    "delete_task": 1,
+}
+STATUSES = ("TODO", "IN_PROGRESS", "DONE")
+
+
+@dataclass
+class LoadState:
+    """Ids the operations work on; tasks created during the run join the pool.
+
+    Task ids are leased for the length of a request, and deletes only take ids nobody holds,
+    so no request is sent for a task the run itself has deleted: a 404 is the server's.
+    """
+
+    project_ids: List[int]
+    task_ids: List[int]
+    rng: random.Random = field(default_factory=random.Random)
+    leases: Counter = field(default_factory=Counter)
+
+    def project(self) -> int:
+        return self.rng.choice(self.project_ids)
+
+    @contextlib.contextmanager
+    def task(self) -> Iterator[int]:
+        task_id = self.rng.choice(self.task_ids)
+        self.leases[task_id] += 1
+        try:
+            yield task_id
+        finally:
+            self.leases[task_id] -= 1
+            if not self.leases[task_id]:
+                del self.leases[task_id]
+
+    def take_task(self) -> Optional[int]:
+        """Remove and return a task id nobody holds; None at the floor of one task per project."""
+        if len(self.task_ids) <= len(self.project_ids):
+            return None
+        idle = [index for index, task_id in enumerate(self.task_ids) if task_id not in self.leases]
+        if not idle:
+            return None
+        return self.task_ids.pop(self.rng.choice(idle))
+
+
+# An operation returns None when it has nothing to do; such a call is not recorded.
+Operation = Callable[[httpx.AsyncClient, LoadState], Awaitable[Optional[httpx.Response]]]
+
+
+async def _create_task(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    response = await client.post(
+        "/tasks",
+        json={
+            "title": f"Load {uuid4().hex[:8]}",
+            "project_id": state.project(),
+            "priority": state.rng.randint(1, 5),
+        },
+    )
+    if response.status_code == 201:
+        state.task_ids.append(response.json()["id"])
+    return response
+
+
+async def _get_task(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    with state.task() as task_id:
+        return await client.get(f"/tasks/{task_id}")
+
+
+async def _update_task(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    with state.task() as task_id:
+        return await client.put(f"/tasks/{task_id}", json={"status": state.rng.choice(STATUSES)})
+
+
+async def _delete_task(client: httpx.AsyncClient, state: LoadState) -> Optional[httpx.Response]:
+    task_id = state.take_task()
+    if task_id is None:  # keep a floor so reads always have ids to pick from
+        return None
+    return await client.delete(f"/tasks/{task_id}")
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "list_projects": lambda client, state: client.get("/projects", params={"limit": 50}),
+    "get_project": lambda client, state: client.get(f"/projects/{state.project()}"),
+    "list_tasks": lambda client, state: client.get("/tasks", params={"limit": 50}),
+    "filter_tasks": lambda client, state: client.get(
+        "/tasks",
+        params={"project_id": state.project(), "status": state.rng.choice(STATUSES), "priority_min": 3},
+    ),
+    "get_task": _get_task,
+    "create_task": _create_task,
+    "update_task": _update_task,
+    "delete_task": _delete_task,
+}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """`name=weight,...` over OPERATIONS; ValueError on unknown names or bad weights."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = int(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"weight for {name} must not be negative")
+    if not any(mix.values()):
+        raise ValueError("the mix needs at least one positive weight")
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(1, math.ceil(len(sorted_values) * fraction)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, operation: str, seconds: float, status: Optional[int]) -> None:
+        self.latencies.setdefault(operation, []).append(seconds)
+        codes = self.statuses.setdefault(operation, {})
+        key = str(status) if status is not None else "transport_error"
+        codes[key] = codes.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def report(self, elapsed: float, **settings) -> dict:
+        endpoints = {
+            name: self._summary(latencies, self.errors.get(name, 0), elapsed, self.statuses[name])
+            for name, latencies in sorted(self.latencies.items())
+        }
+        every = [latency for latencies in self.latencies.values() for latency in latencies]
+        total = self._summary(every, sum(self.errors.values()), elapsed)
+        return {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **settings,
+            "duration_seconds": round(elapsed, 3),
+            "total": total,
+            "endpoints": endpoints,
+        }
+
+    @staticmethod
+    def _summary(
+        latencies: List[float], errors: int, elapsed: float, statuses: Optional[dict] = None
+    ) -> dict:
+        ordered = sorted(latencies)
+        summary = {
+            "requests": len(ordered),
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(ordered, 0.50) * 1000, 2),
+                "p95": round(percentile(ordered, 0.95) * 1000, 2),
+                "p99": round(percentile(ordered, 0.99) * 1000, 2),
+                "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+                "mean": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+            },
+        }
+        if statuses is not None:
+            summary["status_codes"] = dict(sorted(statuses.items()))
+        return summary
+
+
+async def seed(
+    client: httpx.AsyncClient, projects: int, tasks_per_project: int, rng: random.Random
+) -> LoadState:
+    run = uuid4().hex[:8]
+    project_ids, task_ids = [], []
+    for index in range(projects):
+        response = await client.post(
+            "/projects", json={"name": f"load-{run}-{index}", "description": "load test"}
+        )
+        response.raise_for_status()
+        project_ids.append(response.json()["id"])
+    for project_id in project_ids:
+        tasks = [
+            {"title": f"Seed {index}", "project_id": project_id, "priority": rng.randint(1, 5)}
+            for index in range(tasks_per_project)
+        ]
+        response = await client.post("/tasks/bulk", json=tasks)
+        response.raise_for_status()
+        task_ids.extend(task["id"] for task in response.json()["created"])
+    return LoadState(project_ids, task_ids, rng)
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    mix: Dict[str, int] = DEFAULT_MIX,
+    duration: float = 10.0,
+    concurrency: int = 10,
+    rate: Optional[float] = None,
+    projects: int = 5,
+    tasks_per_project: int = 20,
+    keep: bool = False,
+    seed_value: Optional[int] = None,
+) -> dict:
+    """Drive `client` for `duration` seconds and return the report."""
+    rng = random.Random(seed_value)
+    state = await seed(client, projects, tasks_per_project, rng)
+    names = [name for name, weight in mix.items() if weight]
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+
+    async def call(name: str, scheduled: float) -> None:
+        status = None
+        try:
+            response = await OPERATIONS[name](client, state)
+            if response is None:
+                return
+            status = response.status_code
+        except httpx.HTTPError:
+            pass
+        recorder.record(name, time.perf_counter() - scheduled, status)
+
+    started = time.perf_counter()
+    deadline = started + duration
+    if rate is None:
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                await call(rng.choices(names, weights)[0], time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    else:
+        in_flight = asyncio.Semaphore(concurrency)
+        pending = set()
+
+        async def scheduled_call(name: str, at: float) -> None:
+            async with in_flight:
+                await call(name, at)
+
+        for sent in range(int(duration * rate)):
+            at = started + sent / rate
+            await asyncio.sleep(max(0.0, at - time.perf_counter()))
+            task = asyncio.create_task(scheduled_call(rng.choices(names, weights)[0], at))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+    elapsed = time.perf_counter() - started
+
+    if not keep:
+        for project_id in state.project_ids:
+            await client.delete(f"/projects/{project_id}")
+    return recorder.report(
+        elapsed,
+        target=str(client.base_url),
+        mode="rate" if rate is not None else "concurrency",
+        concurrency=concurrency,
+        rate=rate,
+        mix=dict(mix),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--base-url", default=os.getenv("E2E_BASE_URL"), help="defaults to E2E_BASE_URL")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=10, help="workers, or max in flight with --rate")
+    parser.add_argument("--rate", type=float, help="requests per second (open loop)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. list_tasks=4,create_task=1")
+    parser.add_argument("--projects", type=int, default=5, help="projects seeded for the run")
+    parser.add_argument("--tasks-per-project", type=int, default=20)
+    parser.add_argument("--seed", type=int, help="random seed for a repeatable request sequence")
+    parser.add_argument("--keep", action="store_true", help="leave the seeded projects in place")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--max-error-rate", type=float, help="exit 1 when the overall error rate is higher")
+    args = parser.parse_args(argv)
+    if not args.base_url:
+        parser.error("set --base-url or E2E_BASE_URL")
+
+    async def run() -> dict:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+            return await run_load(
+                client,
+                mix=args.mix,
+                duration=args.duration,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                projects=args.projects,
+                tasks_per_project=args.tasks_per_project,
+                keep=args.keep,
+                seed_value=args.seed,
+            )
+
+    report = asyncio.run(run())
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(body + "\n")
+    else:
+        print(body)
+    total, latency = report["total"], report["total"]["latency_ms"]
+    print(
+        f"{total['requests']} requests, {total['throughput_rps']} req/s, "
+        f"error rate {total['error_rate']:.2%}, "
+        f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms",
+        file=sys.stderr,
+    )
+    if args.max_error_rate is not None and total["error_rate"] > args.max_error_rate:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
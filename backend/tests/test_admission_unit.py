@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from app import admission
+from app.admission import AdmissionControlMiddleware, Budget, admitted, request_class
+from app.database import POOL_OPTIONS
+
+
+@pytest.mark.unit
+def test_default_budgets_fit_the_primary_pool():
+    capacity = POOL_OPTIONS["pool_size"] + POOL_OPTIONS["max_overflow"]
+    assert admission.ADMISSION_READ_LIMIT + admission.ADMISSION_WRITE_LIMIT == capacity
+
+
+@pytest.mark.unit
+def test_budget_queues_then_sheds():
+    async def scenario():
+        budget = Budget("read", limit=1, queue_size=1, timeout=1.0)
+        assert await budget.acquire()
+        queued = asyncio.create_task(budget.acquire())
+        await asyncio.sleep(0)
+        assert budget.queue_depth == 1
+        assert not await budget.acquire()  # queue full: shed at once
+
+        budget.release()  # the slot passes straight to the queued request
+        assert await queued
+        assert budget.active == 1 and budget.queue_depth == 0
+        budget.release()
+        return budget.snapshot()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 2
+    assert stats["queued"] == 1
+    assert stats["rejected_queue_full"] == 1
+    assert stats["queue_wait_seconds"]["count"] == 1
+
+
+@pytest.mark.unit
+def test_budget_times_out_queued_requests():
+    async def scenario():
+        budget = Budget("write", limit=1, queue_size=5, timeout=0.01)
+        assert await budget.acquire()
+        assert not await budget.acquire()
+        budget.release()
+        assert await budget.acquire()  # the timed-out waiter does not hold the slot
+        return budget.snapshot()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["rejected_timeout"] == 1
+    assert stats["in_flight"] == 1
+    assert stats["queue_depth"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "method, path, expected",
+    [
+        ("GET", "/tasks", "read"),
+        ("POST", "/tasks/batch-get", "read"),
+        ("POST", "/tasks", "write"),
+        ("DELETE", "/projects/1", "write"),
+    ],
+)
+def test_request_class(method, path, expected):
+    assert request_class({"method": method, "path": path}) == expected
+
+
+@pytest.mark.unit
+def test_middleware_sheds_with_retry_after():
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        if scope["method"] == "GET" and scope["path"] == "/tasks":
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    app = AdmissionControlMiddleware(
+        slow_app, read_limit=1, write_limit=1, read_queue=0, write_queue=0, retry_after=2
+    )
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://admission") as client:
+            first = asyncio.create_task(client.get("/tasks"))
+            while not app.budgets["read"].active:
+                await asyncio.sleep(0.001)
+            shed = await client.get("/tasks")
+            write = await client.post("/tasks")  # writes have their own budget
+            metrics = await client.get("/metrics")  # exempt
+            task_metrics = await client.get("/metrics/tasks")  # queries the database: metered
+            release.set()
+            return await first, shed, write, metrics, task_metrics
+
+    first, shed, write, metrics, task_metrics = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "2"
+    assert write.status_code == 200
+    assert metrics.status_code == 200
+    assert task_metrics.status_code == 503
+    assert app.budgets["read"].snapshot()["rejected_queue_full"] == 2
+
+
+@pytest.mark.unit
+def test_self_admitted_route_takes_its_slot_after_the_upload():
+    receiving, received = asyncio.Event(), asyncio.Event()
+    api = FastAPI()
+
+    @api.post("/import")
+    async def import_data(request: Request):
+        receiving.set()
+        await received.wait()  # the body is still arriving
+        async with admitted(request):
+            return {"imported": True}
+
+    @api.post("/tasks")
+    async def create_task():
+        return {}
+
+    app = AdmissionControlMiddleware(api, read_limit=1, write_limit=1, read_queue=0, write_queue=0)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://admission") as client:
+            upload = asyncio.create_task(client.post("/import"))
+            await receiving.wait()
+            write = await client.post("/tasks")  # the upload holds no write slot
+            assert await app.budgets["write"].acquire()
+            received.set()
+            shed = await upload  # the import itself needs one
+            app.budgets["write"].release()
+            return write, shed, await client.post("/import")
+
+    write, shed, imported = asyncio.run(scenario())
+
+    assert write.status_code == 200
+    assert shed.status_code == 503
+    assert "Retry-After" in shed.headers
+    assert imported.json() == {"imported": True}
@@ -1,4 +1,16 @@
+import csv
+import io
+import json
+from datetime import date
+
 import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import crud, database, schemas, serialization, telemetry
+from app.main import create_app
+from app.replicas import ReplicaRouter
 
 
 def _create_project(client, name="Core", description="desc"):
@@ -43,6 +55,171 @@ def test_get_project_by_id(client):
     assert response.json()["name"] == "GetMe"
 
 
+@pytest.mark.integration
+def test_get_project_with_tasks(client):
+    project = _create_project(client, "Board")
+    other = _create_project(client, "Other board")
+    tasks = [_create_task(client, project["id"], f"Card {i}", status="DONE" if i % 2 else "TODO") for i in range(5)]
+    _create_task(client, other["id"], "Elsewhere")
+
+    first = client.get(f"/projects/{project['id']}", params={"include": "tasks", "limit": 2})
+    assert first.status_code == 200
+    body = first.json()
+    assert body["name"] == "Board"
+    assert [task["id"] for task in body["tasks"]] == [tasks[4]["id"], tasks[3]["id"]]
+    assert "project" not in body["tasks"][0]
+
+    rest = client.get(
+        f"/projects/{project['id']}",
+        params={"include": "tasks", "cursor": first.headers["X-Next-Cursor"]},
+    )
+    assert [task["id"] for task in rest.json()["tasks"]] == [tasks[2]["id"], tasks[1]["id"], tasks[0]["id"]]
+    assert "X-Next-Cursor" not in rest.headers
+
+    done = client.get(f"/projects/{project['id']}", params={"include": "tasks", "status": "DONE"})
+    assert [task["id"] for task in done.json()["tasks"]] == [tasks[3]["id"], tasks[1]["id"]]
+
+    empty = client.get(f"/projects/{other['id']}", params={"include": "tasks", "status": "DONE"})
+    assert empty.json()["tasks"] == []
+    assert "tasks" not in client.get(f"/projects/{project['id']}").json()
+    assert client.get("/projects/999", params={"include": "tasks"}).status_code == 404
+
+
+@pytest.mark.integration
+def test_batch_get_tasks_and_projects(client):
+    project = _create_project(client, "Batch")
+    other = _create_project(client, "Batch two")
+    first = _create_task(client, project["id"], "Batch 1")
+    second = _create_task(client, other["id"], "Batch 2")
+    missing = second["id"] + 100
+
+    response = client.get("/tasks", params={"ids": f"{second['id']},{missing},{first['id']}"})
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()] == [second["id"], first["id"]]
+    assert response.json()[0]["project"]["name"] == "Batch two"
+    assert response.headers["X-Missing-Ids"] == str(missing)
+
+    response = client.post("/tasks/batch-get", json={"ids": [first["id"], missing, first["id"]]})
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()["items"]] == [first["id"]]
+    assert response.json()["missing"] == [missing]
+
+    response = client.post("/projects/batch-get", json={"ids": [other["id"], project["id"], 999]})
+    assert [item["name"] for item in response.json()["items"]] == ["Batch two", "Batch"]
+    assert response.json()["missing"] == [999]
+    response = client.get("/projects", params={"ids": f"{project['id']}"})
+    assert [item["id"] for item in response.json()] == [project["id"]]
+    assert "X-Missing-Ids" not in response.headers
+
+    assert client.get("/tasks", params={"ids": "1,x"}).status_code == 422
+    assert client.post("/tasks/batch-get", json={"ids": []}).status_code == 422
+
+
+@pytest.mark.integration
+def test_fast_serialization_matches_pydantic_path(client, monkeypatch):
+    project = _create_project(client, "Ñandú")
+    for i in range(1, 4):
+        payload = {"title": f"Tarea {i} ✓", "priority": i, "due_date": f"2030-01-0{i}"}
+        client.post("/tasks", json={**payload, "project_id": project["id"]})
+    requests = [
+        ("/tasks", {"limit": 2}),
+        ("/tasks", {"sort": "due_date", "priority_min": 2}),
+        ("/projects", {}),
+    ]
+    slow = [client.get(path, params=params) for path, params in requests]
+    monkeypatch.setattr(serialization, "FAST_SERIALIZATION", True)
+    fast = [client.get(path, params=params) for path, params in requests]
+
+    for expected, response in zip(slow, fast):
+        assert response.status_code == 200
+        assert response.content == expected.content
+        assert response.headers.get("X-Next-Cursor") == expected.headers.get("X-Next-Cursor")
+        assert response.headers["ETag"] == expected.headers["ETag"]
+
+
+@pytest.mark.integration
+def test_list_tasks_sparse_fields(client):
+    project = _create_project(client, "Sparse")
+    tasks = [_create_task(client, project["id"], f"Sparse {i}", priority=i + 1) for i in range(3)]
+
+    first = client.get("/tasks", params={"fields": "status,id,title", "sort": "priority", "limit": 2})
+    assert first.status_code == 200
+    assert first.json() == [
+        {"title": task["title"], "status": "TODO", "id": task["id"]} for task in tasks[:2]
+    ]
+    rest = client.get(
+        "/tasks",
+        params={"fields": "id,title,status", "sort": "priority", "cursor": first.headers["X-Next-Cursor"]},
+    )
+    assert [task["id"] for task in rest.json()] == [tasks[2]["id"]]
+
+    with_project = client.get("/tasks", params={"fields": "id,project", "limit": 1}).json()
+    assert with_project == [{"id": tasks[2]["id"], "project": client.get("/tasks").json()[0]["project"]}]
+    assert client.get("/tasks", params={"fields": "id,secret"}).status_code == 422
+
+
+@pytest.mark.integration
+def test_large_responses_are_compressed(client):
+    project = _create_project(client, "Compressed")
+    client.post(
+        "/tasks/bulk", json=[{"title": f"Compressed {i}", "project_id": project["id"]} for i in range(50)]
+    )
+    plain = client.get("/tasks", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+
+    for coding in ("gzip", "br"):
+        response = client.get("/tasks", headers={"Accept-Encoding": f"{coding}, identity;q=0.5"})
+        assert response.headers["Content-Encoding"] == coding
+        assert int(response.headers["Content-Length"]) < len(plain.content) / 4
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.headers["ETag"] == plain.headers["ETag"]
+        assert response.headers["ETag"].startswith("W/")
+        assert response.json() == plain.json()
+        revalidated = client.get(
+            "/tasks", headers={"Accept-Encoding": coding, "If-None-Match": response.headers["ETag"]}
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.headers["ETag"] == response.headers["ETag"]
+
+    small = client.get(f"/projects/{project['id']}", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+
+@pytest.mark.integration
+def test_prometheus_metrics_per_route(client):
+    project = _create_project(client, "Observed")
+    telemetry.REQUEST_METRICS.reset()
+    client.get("/tasks", params={"project_id": project["id"]})
+    client.get("/tasks/999999")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == telemetry.PROMETHEUS_CONTENT_TYPE
+    lines = response.text.splitlines()
+    assert 'http_requests_total{method="GET",route="/tasks",status="200"} 1' in lines
+    assert 'http_requests_total{method="GET",route="/tasks/{task_id}",status="404"} 1' in lines
+    assert "http_requests_in_flight 1" in lines
+    assert 'http_request_duration_seconds_count{method="GET",route="/tasks"} 1' in lines
+    assert 'http_request_db_queries_bucket{method="GET",route="/tasks/{task_id}",le="0"} 0' in lines
+    assert any(line.startswith('db_pool_checkouts_total{pool="primary"}') for line in lines)
+    assert 'admission_rejected_total{request_class="read",reason="queue_full"} 0' in lines
+    assert client.get("/metrics/admission").json()["read"]["admitted"] >= 2
+
+
+@pytest.mark.integration
+def test_slow_requests_are_logged_with_their_sql(client, monkeypatch, caplog):
+    project = _create_project(client, "Sluggish")
+    monkeypatch.setattr(telemetry, "SLOW_REQUEST_SECONDS", 1e-9)
+
+    with caplog.at_level("WARNING", logger="app.telemetry"):
+        client.get(f"/projects/{project['id']}", headers={"X-Read-Primary": "1"})
+
+    (record,) = [record for record in caplog.records if record.name == "app.telemetry"]
+    assert record.getMessage().startswith(f"Slow request GET /projects/{project['id']} -> 200")
+    assert "FROM projects" in record.getMessage()
+
+
 @pytest.mark.integration
 def test_update_project_fields(client):
     created = _create_project(client, "OldName")
@@ -62,6 +239,30 @@ def test_delete_project_removes_tasks(client):
     assert list_response.json() == []
 
 
+@pytest.mark.integration
+def test_delete_large_project_hides_it_until_purged(client, db_session, monkeypatch):
+    monkeypatch.setattr(crud, "PROJECT_PURGE_THRESHOLD", 2)
+    project = _create_project(client, "Large")
+    tasks = [_create_task(client, project["id"], f"Large {i}") for i in range(3)]
+
+    assert client.delete(f"/projects/{project['id']}").status_code == 204
+
+    assert client.get(f"/projects/{project['id']}").status_code == 404
+    assert client.get(f"/tasks/{tasks[0]['id']}").status_code == 404
+    assert client.get("/tasks", params={"project_id": project["id"]}).json() == []
+    assert client.put(f"/tasks/{tasks[0]['id']}", json={"status": "DONE"}).status_code == 404
+    assert client.post("/tasks", json={"title": "Late", "project_id": project["id"]}).status_code == 404
+    assert client.get("/metrics/tasks").json()["total"] == 0
+    live = _create_project(client, "Live")
+    mover = _create_task(client, live["id"], "Mover")
+    move = {"ids": [mover["id"]], "changes": {"project_id": project["id"]}}
+    assert client.patch("/tasks/bulk", json=move).status_code == 404
+    assert client.get(f"/tasks/{mover['id']}").json()["project_id"] == live["id"]
+
+    assert crud.purge_deleted_projects(db_session) == 3
+    assert client.delete(f"/projects/{project['id']}").status_code == 404
+
+
 @pytest.mark.integration
 @pytest.mark.parametrize(
     "status",
@@ -120,3 +321,442 @@ def test_task_priority_persistence(client, priority):
     project = _create_project(client, "Priorities")
     task = _create_task(client, project["id"], title=f"P{priority}", priority=priority)
     assert task["priority"] == priority
+
+
+@pytest.mark.integration
+def test_list_tasks_cursor_pagination(client):
+    project = _create_project(client, "Paging")
+    created = [_create_task(client, project["id"], f"Task {i}") for i in range(5)]
+
+    first = client.get("/tasks", params={"limit": 2})
+    assert first.status_code == 200
+    assert [t["id"] for t in first.json()] == [created[4]["id"], created[3]["id"]]
+
+    seen = [t["id"] for t in first.json()]
+    cursor = first.headers["X-Next-Cursor"]
+    while cursor:
+        page = client.get("/tasks", params={"limit": 2, "cursor": cursor})
+        seen.extend(t["id"] for t in page.json())
+        cursor = page.headers.get("X-Next-Cursor")
+    assert seen == [t["id"] for t in reversed(created)]
+
+
+@pytest.mark.integration
+def test_list_projects_last_page_has_no_cursor(client):
+    _create_project(client, "Only")
+    response = client.get("/projects", params={"limit": 5})
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.integration
+def test_list_tasks_invalid_cursor(client):
+    response = client.get("/tasks", params={"cursor": "garbage"})
+    assert response.status_code == 400
+
+
+@pytest.mark.integration
+def test_sync_returns_changes_and_tombstones(client, monkeypatch):
+    monkeypatch.setattr(crud, "SYNC_SETTLE_SECONDS", 0)
+    project = _create_project(client, "Synced")
+    doomed = _create_project(client, "Doomed")
+    edited, removed = (_create_task(client, project["id"], title) for title in ("Edited", "Removed"))
+
+    full = client.get("/sync", params={"limit": 100})
+    assert full.status_code == 200
+    assert {p["id"] for p in full.json()["projects"]} >= {project["id"], doomed["id"]}
+    assert {t["id"] for t in full.json()["tasks"]} >= {edited["id"], removed["id"]}
+    assert full.json()["deleted"] == {"projects": [], "tasks": []}
+    assert full.json()["has_more"] is False
+
+    client.put(f"/tasks/{edited['id']}", json={"status": "DONE"})
+    client.delete(f"/tasks/{removed['id']}")
+    client.delete(f"/projects/{doomed['id']}")
+    added = _create_task(client, project["id"], "Added")
+
+    delta = client.get("/sync", params={"since": full.json()["cursor"]}).json()
+    assert delta["projects"] == []
+    assert [t["id"] for t in delta["tasks"]] == [edited["id"], added["id"]]
+    assert delta["tasks"][0]["status"] == "DONE"
+    assert delta["deleted"] == {"projects": [doomed["id"]], "tasks": [removed["id"]]}
+
+    caught_up = client.get("/sync", params={"since": delta["cursor"]}).json()
+    assert (caught_up["tasks"], caught_up["deleted"]["tasks"]) == ([], [])
+
+    paged = client.get("/sync", params={"since": full.json()["cursor"], "limit": 1}).json()
+    assert paged["has_more"] is True
+    assert [t["id"] for t in paged["tasks"]] == [edited["id"]]
+
+    assert client.get("/sync", params={"since": "garbage"}).status_code == 400
+    monkeypatch.setattr(crud, "SYNC_RETENTION_DAYS", 0)
+    assert client.get("/sync", params={"since": delta["cursor"]}).status_code == 410
+
+
+@pytest.mark.integration
+def test_bulk_create_tasks(client):
+    project = _create_project(client, "Bulk")
+    payload = [{"title": f"Bulk {i}", "project_id": project["id"]} for i in range(3)]
+    payload.append({"title": "Lost", "project_id": project["id"] + 100})
+
+    response = client.post("/tasks/bulk", json=payload)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["index"] for item in body["created"]] == [0, 1, 2]
+    assert body["errors"] == [{"index": 3, "detail": f"Project {project['id'] + 100} not found"}]
+    titles = {task["id"]: task["title"] for task in client.get("/tasks").json()}
+    assert [titles[item["id"]] for item in body["created"]] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+
+
+@pytest.mark.integration
+def test_bulk_create_tasks_rejects_empty_payload(client):
+    response = client.post("/tasks/bulk", json=[])
+    assert response.status_code == 422
+
+
+@pytest.mark.integration
+def test_bulk_update_tasks_by_ids(client):
+    project = _create_project(client, "BulkUpdate")
+    tasks = [_create_task(client, project["id"], f"Move {i}") for i in range(3)]
+    ids = [task["id"] for task in tasks[:2]]
+
+    response = client.patch(
+        "/tasks/bulk", json={"ids": ids + [ids[-1] + 1000], "changes": {"status": "DONE"}}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"updated": ids, "missing": [ids[-1] + 1000]}
+    statuses = {task["id"]: task["status"] for task in client.get("/tasks").json()}
+    assert statuses == {ids[0]: "DONE", ids[1]: "DONE", tasks[2]["id"]: "TODO"}
+    by_status = client.get("/metrics/tasks").json()["by_status"]
+    assert (by_status["DONE"], by_status["TODO"]) == (2, 1)
+
+
+@pytest.mark.integration
+def test_bulk_update_tasks_unknown_project(client):
+    project = _create_project(client, "BulkMove")
+    _create_task(client, project["id"], "Stay")
+    response = client.patch(
+        "/tasks/bulk",
+        json={"filter": {"project_id": project["id"]}, "changes": {"project_id": project["id"] + 99}},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.integration
+def test_bulk_update_tasks_rejects_null_changes(client):
+    project = _create_project(client, "BulkNulls")
+    task = _create_task(client, project["id"], "Keep title")
+
+    for changes in ({"title": None}, {"project_id": None}):
+        response = client.patch("/tasks/bulk", json={"ids": [task["id"]], "changes": changes})
+        assert response.status_code == 422
+
+    assert client.get(f"/tasks/{task['id']}").json()["title"] == "Keep title"
+
+
+@pytest.mark.integration
+def test_task_writes_unknown_project(client):
+    project = _create_project(client, "Orphans")
+    task = _create_task(client, project["id"], "Stay")
+
+    created = client.post("/tasks", json={"title": "Lost", "project_id": project["id"] + 99})
+    assert created.status_code == 404
+    moved = client.put(f"/tasks/{task['id']}", json={"project_id": project["id"] + 99})
+    assert moved.status_code == 404
+    assert client.get(f"/tasks/{task['id']}").json()["project"]["id"] == project["id"]
+
+
+@pytest.mark.integration
+def test_task_writes_keep_counters(client):
+    project = _create_project(client, "Counters")
+    other = _create_project(client, "Counters elsewhere")
+    first = _create_task(client, project["id"], "First")
+    second = _create_task(client, project["id"], "Second", priority=5)
+
+    updated = client.put(f"/tasks/{first['id']}", json={"status": "DONE"})
+    assert updated.json()["status"] == "DONE"
+    client.put(f"/tasks/{second['id']}", json={"project_id": other["id"]})
+    client.delete(f"/tasks/{first['id']}")
+
+    assert client.get(f"/projects/{project['id']}/metrics").json()["total"] == 0
+    moved = client.get(f"/projects/{other['id']}/metrics").json()
+    assert moved["total"] == 1
+    assert moved["by_priority"]["5"] == 1
+
+
+@pytest.mark.integration
+def test_update_project_duplicate_name(client):
+    _create_project(client, "Taken")
+    project = _create_project(client, "Free")
+    response = client.put(f"/projects/{project['id']}", json={"name": "Taken"})
+    assert response.status_code == 409
+
+
+@pytest.mark.integration
+def test_project_and_global_task_metrics(client):
+    project = _create_project(client, "Metrics")
+    other = _create_project(client, "Elsewhere")
+    _create_task(client, project["id"], "Open", priority=1)
+    done = _create_task(client, project["id"], "Finished", status="DONE")
+    _create_task(client, other["id"], "Remote")
+    client.post(
+        "/tasks", json={"title": "Late one", "project_id": project["id"], "due_date": "2001-01-01"}
+    )
+    client.delete(f"/tasks/{done['id']}")
+
+    response = client.get(f"/projects/{project['id']}/metrics")
+    assert response.status_code == 200
+    assert response.json() == {
+        "total": 2,
+        "by_status": {"TODO": 2, "IN_PROGRESS": 0, "DONE": 0},
+        "by_priority": {"1": 1, "2": 0, "3": 1, "4": 0, "5": 0},
+        "overdue": 1,
+    }
+    assert client.get("/metrics/tasks").json()["total"] == 3
+
+
+@pytest.mark.integration
+def test_project_metrics_not_found(client):
+    response = client.get("/projects/999/metrics")
+    assert response.status_code == 404
+
+
+@pytest.mark.integration
+def test_pool_metrics_endpoint(client):
+    response = client.get("/metrics/pool")
+    assert response.status_code == 200
+    primary = response.json()["primary"]
+    assert primary["pool_size"] >= 1
+    assert "+Inf" in primary["checkout_wait_seconds"]["buckets"]
+
+
+@pytest.mark.integration
+def test_cached_reads_follow_writes(client):
+    project = _create_project(client, "Before")
+    task = _create_task(client, project["id"], "Cached read")
+    client.get(f"/tasks/{task['id']}")
+
+    client.put(f"/projects/{project['id']}", json={"name": "After"})
+    client.put(f"/tasks/{task['id']}", json={"priority": 5})
+    body = client.get(f"/tasks/{task['id']}").json()
+
+    assert (body["priority"], body["project"]["name"]) == (5, "After")
+    assert client.get(f"/tasks/{task['id']}").json() == body
+    assert client.get("/metrics/cache").json()["hits"] >= 1
+
+
+@pytest.mark.integration
+def test_task_etag_revalidation(client):
+    project = _create_project(client, "Tagged")
+    task = _create_task(client, project["id"], "Tag me")
+
+    first = client.get(f"/tasks/{task['id']}")
+    etag = first.headers["ETag"]
+    cached = client.get(f"/tasks/{task['id']}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    client.put(f"/projects/{project['id']}", json={"name": "Retagged"})
+    changed = client.get(f"/tasks/{task['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["project"]["name"] == "Retagged"
+
+
+@pytest.mark.integration
+def test_project_etag_revalidation(client):
+    project = _create_project(client, "Versioned")
+    etag = client.get(f"/projects/{project['id']}").headers["ETag"]
+
+    assert client.get(f"/projects/{project['id']}", headers={"If-None-Match": etag}).status_code == 304
+    client.put(f"/projects/{project['id']}", json={"description": "edited"})
+    assert client.get(f"/projects/{project['id']}", headers={"If-None-Match": etag}).status_code == 200
+    missing = client.get("/projects/999", headers={"If-None-Match": etag})
+    assert missing.status_code == 404
+
+
+@pytest.mark.integration
+def test_list_etags_track_changes(client, monkeypatch):
+    project = _create_project(client, "Listed")
+    task = _create_task(client, project["id"], "Listed task")
+    etag = client.get("/tasks").headers["ETag"]
+    projects_etag = client.get("/projects").headers["ETag"]
+
+    assert client.get("/tasks", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/tasks", params={"limit": 1}, headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/projects", headers={"If-None-Match": projects_etag}).status_code == 304
+
+    client.put(f"/tasks/{task['id']}", json={"status": "DONE"})
+    updated = client.get("/tasks", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    client.delete(f"/tasks/{task['id']}")
+    assert client.get("/tasks", headers={"If-None-Match": updated.headers["ETag"]}).status_code == 200
+
+    overdue_etag = client.get("/tasks", params={"overdue": True}).headers["ETag"]
+    revalidate = {"params": {"overdue": True}, "headers": {"If-None-Match": overdue_etag}}
+    assert client.get("/tasks", **revalidate).status_code == 304
+    monkeypatch.setattr(crud, "today", lambda: date(2999, 1, 1))  # midnight passed, no writes
+    assert client.get("/tasks", **revalidate).status_code == 200
+
+
+@pytest.mark.integration
+def test_export_tasks_ndjson_and_csv(client):
+    exported = _create_project(client, "Export")
+    other = _create_project(client, "Other export")
+    for i in range(3):
+        _create_task(client, exported["id"], f"Export {i}", status="DONE")
+    _create_task(client, other["id"], "Elsewhere")
+
+    response = client.get("/tasks/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Export 0", "Export 1", "Export 2", "Elsewhere"]
+    assert rows[0]["status"] == "DONE" and rows[0]["project_name"] == "Export"
+
+    response = client.get("/tasks/export", params={"format": "csv", "project_id": exported["id"]})
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks.csv"'
+    records = list(csv.DictReader(io.StringIO(response.text)))
+    assert {record["project_name"] for record in records} == {"Export"}
+    assert len(records) == 3
+
+    assert client.get("/tasks/export", params={"format": "xml"}).status_code == 422
+
+
+@pytest.mark.integration
+def test_import_projects_and_tasks(client):
+    _create_project(client, "Legacy", "before import")
+    projects_csv = "name,description\nLegacy,after import\nImported,from csv\n"
+    response = client.post(
+        "/import", params={"kind": "projects", "format": "csv", "on_conflict": "update"}, content=projects_csv
+    )
+    assert response.status_code == 200
+    assert response.json()["imported"] == 2
+
+    tasks_ndjson = "\n".join(
+        json.dumps(record)
+        for record in [
+            {"title": "Imported task", "project_name": "Imported", "description": "a,b \\N \"q\""},
+            {"title": "Legacy task", "project_name": "Legacy", "status": "DONE"},
+            {"title": "Lost task", "project_name": "Nowhere"},
+        ]
+    )
+    result = client.post("/import", params={"kind": "tasks"}, content=tasks_ndjson).json()
+    assert (result["rows"], result["imported"], result["failed"]) == (3, 2, 1)
+    assert result["errors"][0]["index"] == 2
+
+    tasks = {task["title"]: task for task in client.get("/tasks").json()}
+    assert tasks["Imported task"]["description"] == 'a,b \\N "q"'
+    assert tasks["Legacy task"]["project"]["description"] == "after import"
+    assert client.get("/metrics/tasks").json()["total"] == 2
+
+
+@pytest.mark.integration
+def test_search_tasks_ranked_filtered_and_paginated(client):
+    project = _create_project(client, "Searchable")
+    other = _create_project(client, "Elsewhere")
+    titled = _create_task(client, project["id"], "Migrar base de datos")
+    client.put(f"/tasks/{titled['id']}", json={"description": "copias de seguridad"})
+    described = _create_task(client, project["id"], "Revisar backups")
+    client.put(f"/tasks/{described['id']}", json={"description": "la base de datos de staging", "status": "DONE"})
+    _create_task(client, other["id"], "Base de datos ajena")
+    _create_task(client, project["id"], "Sin relación")
+
+    response = client.get("/tasks/search", params={"q": "base datos", "project_id": project["id"]})
+    assert response.status_code == 200
+    # Title hits (weight A) outrank description hits (weight B).
+    assert [task["id"] for task in response.json()] == [titled["id"], described["id"]]
+
+    done = client.get("/tasks/search", params={"q": "datos", "status": "DONE"}).json()
+    assert [task["id"] for task in done] == [described["id"]]
+    excluded = client.get("/tasks/search", params={"q": "datos -ajena"}).json()
+    assert {task["id"] for task in excluded} == {titled["id"], described["id"]}
+
+    first = client.get("/tasks/search", params={"q": "datos", "limit": 2})
+    second = client.get("/tasks/search", params={"q": "datos", "limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    ids = [task["id"] for task in first.json() + second.json()]
+    assert len(ids) == len(set(ids)) == 3
+    assert "X-Next-Cursor" not in second.headers
+    assert client.get("/tasks/search", params={"q": ""}).status_code == 422
+
+
+@pytest.mark.integration
+def test_list_tasks_server_side_filters(client):
+    project = _create_project(client, "Kanban")
+    todo = _create_task(client, project["id"], "Write spec", status="TODO", priority=2)
+    doing = _create_task(client, project["id"], "Build it", status="IN_PROGRESS", priority=4)
+    _create_task(client, project["id"], "Ship it", status="DONE", priority=5)
+    client.put(f"/tasks/{todo['id']}", json={"due_date": "2001-01-01"})
+    client.put(f"/tasks/{doing['id']}", json={"due_date": "2999-01-01"})
+
+    params = {"project_id": project["id"], "status": ["TODO", "IN_PROGRESS"], "sort": "-priority"}
+    assert [task["id"] for task in client.get("/tasks", params=params).json()] == [doing["id"], todo["id"]]
+    assert [t["id"] for t in client.get("/tasks", params={"overdue": True}).json()] == [todo["id"]]
+    in_range = client.get("/tasks", params={"due_from": "2500-01-01", "priority_min": 3, "priority_max": 4}).json()
+    assert [task["id"] for task in in_range] == [doing["id"]]
+
+    page = client.get("/tasks", params={"sort": "due_date", "limit": 2})
+    rest = client.get("/tasks", params={"sort": "due_date", "limit": 2, "cursor": page.headers["X-Next-Cursor"]})
+    assert [t["title"] for t in page.json() + rest.json()] == ["Write spec", "Build it", "Ship it"]
+
+    assert client.get("/tasks", params={"sort": "title"}).status_code == 422
+    assert client.get("/tasks", params={"priority_min": 0}).status_code == 422
+
+
+@pytest.mark.integration
+def test_reads_go_to_replica_until_client_writes(client, replicas, replica_engine):
+    with Session(replica_engine) as replica_db:
+        crud.create_project(replica_db, schemas.ProjectCreate(name="Replica only"))
+
+    assert [p["name"] for p in client.get("/projects").json()] == ["Replica only"]
+
+    assert client.post("/projects", json={"name": "Primary"}).status_code == 201
+    assert "read_primary_until" in client.cookies
+    assert [p["name"] for p in client.get("/projects").json()] == ["Primary"]
+
+    client.cookies.clear()
+    assert [p["name"] for p in client.get("/projects").json()] == ["Replica only"]
+    forced = client.get("/projects", headers={"X-Read-Primary": "1"})
+    assert [p["name"] for p in forced.json()] == ["Primary"]
+
+
+@pytest.mark.integration
+def test_cross_origin_client_reads_its_writes_via_header(client, replicas, replica_engine):
+    with Session(replica_engine) as replica_db:
+        crud.create_project(replica_db, schemas.ProjectCreate(name="Replica only"))
+    spa = {"Origin": "http://spa.example"}
+
+    written = client.post("/projects", json={"name": "Primary"}, headers=spa)
+    assert written.headers["Access-Control-Allow-Origin"] in ("*", "http://spa.example")
+    assert "X-Read-Primary-Until" in written.headers["Access-Control-Expose-Headers"]
+    client.cookies.clear()  # a cross-origin fetch without credentials sends no cookies
+
+    pinned = {**spa, "X-Read-Primary-Until": written.headers["X-Read-Primary-Until"]}
+    assert [p["name"] for p in client.get("/projects", headers=pinned).json()] == ["Primary"]
+    assert [p["name"] for p in client.get("/projects", headers=spa).json()] == ["Replica only"]
+
+
+@pytest.mark.integration
+def test_unhealthy_replica_falls_back_to_primary(client, monkeypatch):
+    down = create_engine("postgresql+psycopg2://postgres@/missing?host=/nonexistent", future=True)
+    router = ReplicaRouter([down])
+    monkeypatch.setattr(database, "replica_router", router)
+    _create_project(client, "Fallback")
+    client.cookies.clear()
+
+    assert [p["name"] for p in client.get("/projects").json()] == ["Fallback"]
+    assert router.pick() is None  # skipped until REPLICA_RETRY_AFTER passes
+
+
+@pytest.mark.integration
+def test_sync_and_async_modes_serve_the_same_routes():
+    def route_table(app):
+        return sorted(
+            (route.path, method, route.endpoint.__name__)
+            for route in app.routes
+            if isinstance(route, APIRoute)
+            for method in route.methods
+        )
+
+    assert route_table(create_app(async_mode=True)) == route_table(create_app(async_mode=False))
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import event
+
+from app import cache, crud, schemas
+from app.cache import LRUCache
+from app.models import TaskStatus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2, ttl=60)
+    lru.set("a", {"v": 1})
+    lru.set("b", {"v": 2})
+    lru.get("a")
+    lru.set("c", {"v": 3})
+
+    assert lru.get("b") is None
+    assert lru.get("a") == {"v": 1}
+    stats = lru.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1, 1)
+
+
+@pytest.mark.unit
+def test_lru_entries_expire_after_ttl():
+    clock = FakeClock()
+    lru = LRUCache(max_entries=10, ttl=5, clock=clock)
+    lru.set("a", {"v": 1})
+    clock.now = 4.9
+    assert lru.get("a") == {"v": 1}
+    clock.now = 5.0
+    assert lru.get("a") is None
+    assert lru.stats()["expirations"] == 1
+
+
+@pytest.fixture
+def statements(sqlite_session):
+    seen = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    engine = sqlite_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", _record)
+
+
+@pytest.mark.unit
+def test_get_task_served_from_cache_until_update(sqlite_session, statements):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Cached"))
+    task = crud.create_task(sqlite_session, schemas.TaskCreate(title="Hot task", project_id=project.id))
+    crud.get_task(sqlite_session, task.id)
+
+    statements.clear()
+    hit = crud.get_task(sqlite_session, task.id)
+    assert statements == []
+    assert (hit.title, hit.project.name) == ("Hot task", "Cached")
+
+    crud.update_task(sqlite_session, task.id, schemas.TaskUpdate(status=TaskStatus.DONE))
+    assert crud.get_task(sqlite_session, task.id).status == TaskStatus.DONE
+
+
+@pytest.mark.unit
+def test_project_delete_hides_cached_tasks(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Doomed"))
+    task = crud.create_task(sqlite_session, schemas.TaskCreate(title="Cached task", project_id=project.id))
+    crud.get_task(sqlite_session, task.id)
+
+    crud.delete_project(sqlite_session, project.id)
+
+    with pytest.raises(crud.NoResultFound):
+        crud.get_task(sqlite_session, task.id)
+    assert cache.entity_cache.get(cache.task_key(task.id)) is None
@@ -0,0 +1,31 @@
+import gzip
+
+import brotli
+import pytest
+
+from app.compression import BrotliEncoder, GzipEncoder, negotiate
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ("gzip, deflate, br", BrotliEncoder),
+        ("gzip;q=1.0, br;q=0.5", GzipEncoder),
+        ("br;q=0, gzip", GzipEncoder),
+        ("*", BrotliEncoder),
+        ("identity", None),
+        ("", None),
+        ("gzip;q=bogus", None),
+    ],
+)
+def test_negotiate_picks_highest_weight(accept, expected):
+    assert negotiate(accept) is expected
+
+
+@pytest.mark.unit
+def test_streamed_chunks_decode_to_the_whole_body():
+    chunks = [b'{"id": 1}\n' * 100, b'{"id": 2}\n' * 100, b""]
+    for encoder, decompress in ((GzipEncoder(), gzip.decompress), (BrotliEncoder(), brotli.decompress)):
+        data = b"".join(encoder.chunk(chunk) for chunk in chunks[:-1]) + encoder.finish(chunks[-1])
+        assert decompress(data) == b"".join(chunks)
@@ -1,22 +1,16 @@
+import asyncio
+from datetime import date
+
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
-from app import crud, schemas
-from app.database import Base
+from app import crud, export, models, schemas
+from app.database import Base, Database
 from app.models import TaskStatus
-
-
-@pytest.fixture
-def sqlite_session():
-    engine = create_engine("sqlite:///:memory:", future=True)
-    Base.metadata.create_all(engine)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    session = SessionLocal()
-    yield session
-    session.close()
-    Base.metadata.drop_all(engine)
-    engine.dispose()
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor, split_page
 
 
 @pytest.mark.unit
@@ -68,3 +62,316 @@ def test_delete_project_cascades(sqlite_session):
     crud.create_task(sqlite_session, schemas.TaskCreate(title="Task 1", project_id=project.id))
     crud.delete_project(sqlite_session, project.id)
     assert crud.list_tasks(sqlite_session) == []
+
+
+@pytest.mark.unit
+def test_delete_large_project_defers_purge(sqlite_session, monkeypatch):
+    monkeypatch.setattr(crud, "PROJECT_PURGE_THRESHOLD", 2)
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Huge"))
+    kept = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Kept"))
+    for i in range(5):
+        crud.create_task(sqlite_session, schemas.TaskCreate(title=f"Task {i}", project_id=project.id))
+    survivor = crud.create_task(sqlite_session, schemas.TaskCreate(title="Survivor", project_id=kept.id))
+
+    assert crud.delete_project(sqlite_session, project.id) is True
+
+    assert [task.id for task in crud.list_tasks(sqlite_session)] == [survivor.id]
+    assert [p.id for p in crud.list_projects(sqlite_session)] == [kept.id]
+    assert crud.get_task_metrics(sqlite_session).total == 1
+    with pytest.raises(NoResultFound):
+        crud.get_project(sqlite_session, project.id)
+    with pytest.raises(NoResultFound):
+        crud.create_task(sqlite_session, schemas.TaskCreate(title="Late", project_id=project.id))
+    with pytest.raises(NoResultFound):
+        crud.delete_project(sqlite_session, project.id)
+
+    assert crud.purge_deleted_projects(sqlite_session, chunk_size=2) == 5
+    assert sqlite_session.get(models.Project, project.id) is None
+    assert sqlite_session.execute(select(func.count(models.Task.id))).scalar_one() == 1
+
+
+@pytest.mark.unit
+def test_deletes_leave_tombstones_until_pruned(sqlite_session, monkeypatch):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Tombstones"))
+    task = crud.create_task(sqlite_session, schemas.TaskCreate(title="Gone", project_id=project.id))
+
+    crud.delete_task(sqlite_session, task.id)
+    crud.delete_project(sqlite_session, project.id)
+
+    logged = sqlite_session.execute(
+        select(models.Deletion.entity, models.Deletion.entity_id).order_by(models.Deletion.id)
+    ).all()
+    assert logged == [(models.DeletedEntity.TASK, task.id), (models.DeletedEntity.PROJECT, project.id)]
+    assert crud.prune_deletions(sqlite_session) == 0
+    monkeypatch.setattr(crud, "SYNC_RETENTION_DAYS", -1)
+    assert crud.prune_deletions(sqlite_session) == 2
+
+
+@pytest.mark.unit
+def test_delete_small_project_cascades_at_once(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Small"))
+    crud.create_task(sqlite_session, schemas.TaskCreate(title="Task 1", project_id=project.id))
+
+    assert crud.delete_project(sqlite_session, project.id) is False
+    assert sqlite_session.execute(select(func.count(models.TaskCounter.project_id))).scalar_one() == 0
+    assert crud.purge_deleted_projects(sqlite_session) == 0
+
+
+@pytest.mark.unit
+def test_get_tasks_by_ids_keeps_request_order(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Lookup"))
+    a, b = (
+        crud.create_task(sqlite_session, schemas.TaskCreate(title=title, project_id=project.id))
+        for title in ("Task A", "Task B")
+    )
+
+    found, missing = crud.get_tasks_by_ids(sqlite_session, [b.id, 99, a.id, b.id])
+
+    assert [task.id for task in found] == [b.id, a.id]
+    assert found[0].project.name == "Lookup"
+    assert missing == [99]
+
+
+@pytest.mark.unit
+def test_list_tasks_keyset_pages(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Paged"))
+    for i in range(5):
+        crud.create_task(sqlite_session, schemas.TaskCreate(title=f"Task {i}", project_id=project.id))
+
+    first = crud.list_tasks(sqlite_session, limit=3)
+    items, next_cursor = split_page(first, 2)
+    rest = crud.list_tasks(sqlite_session, cursor=next_cursor)
+
+    assert [t.title for t in items] == ["Task 4", "Task 3"]
+    assert [t.title for t in rest] == ["Task 2", "Task 1", "Task 0"]
+
+
+@pytest.mark.unit
+def test_list_tasks_filters_and_sorts(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Board"))
+    specs = [
+        ("Late", TaskStatus.TODO, 1, date(2000, 1, 1)),
+        ("Late but done", TaskStatus.DONE, 2, date(2000, 1, 2)),
+        ("Soon", TaskStatus.IN_PROGRESS, 5, date(2999, 1, 1)),
+        ("Someday", TaskStatus.TODO, 3, None),
+        ("Whenever", TaskStatus.IN_PROGRESS, 4, None),
+    ]
+    for title, status, priority, due_date in specs:
+        crud.create_task(
+            sqlite_session,
+            schemas.TaskCreate(title=title, status=status, priority=priority, due_date=due_date, project_id=project.id),
+        )
+
+    def titles(**kwargs):
+        return [task.title for task in crud.list_tasks(sqlite_session, project.id, **kwargs)]
+
+    assert titles(statuses=[TaskStatus.TODO, TaskStatus.IN_PROGRESS], priority_min=3, sort="priority") == [
+        "Someday",
+        "Whenever",
+        "Soon",
+    ]
+    assert titles(overdue=True) == ["Late"]
+    assert titles(due_from=date(2000, 1, 2), due_to=date(2999, 1, 1), sort="-due_date") == ["Soon", "Late but done"]
+    assert titles(priority_max=2, sort="-updated_at") == ["Late but done", "Late"]
+    with pytest.raises(ValueError):
+        crud.list_tasks(sqlite_session, sort="title")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("sort", ["due_date", "-due_date", "priority", "-priority", "updated_at"])
+def test_list_tasks_keyset_pages_any_sort(sqlite_session, sort):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Sorted"))
+    for i in range(7):
+        due_date = date(2030, 1, i % 3 + 1) if i % 2 else None  # duplicates and nulls
+        crud.create_task(
+            sqlite_session,
+            schemas.TaskCreate(title=f"Task {i}", priority=i % 2 + 1, due_date=due_date, project_id=project.id),
+        )
+    expected = [task.id for task in crud.list_tasks(sqlite_session, sort=sort)]
+
+    seen, cursor = [], None
+    while True:
+        rows = crud.list_tasks(sqlite_session, limit=3, cursor=cursor, sort=sort)
+        page, cursor = split_page(rows, 2, key=crud.sort_key(sort))
+        seen += [task.id for task in page]
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert len(expected) == 7
+
+
+@pytest.mark.unit
+def test_list_tasks_rejects_bad_cursor(sqlite_session):
+    with pytest.raises(InvalidCursor):
+        crud.list_tasks(sqlite_session, cursor="not-a-cursor")
+
+
+@pytest.mark.unit
+def test_cursor_round_trips_float_sort_keys():
+    cursor = encode_cursor(0.0607927, 42)
+
+    assert decode_cursor(cursor, float) == (0.0607927, 42)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)  # not a datetime
+
+
+@pytest.mark.unit
+def test_bulk_create_tasks_reports_missing_projects(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Bulk"))
+    result = crud.bulk_create_tasks(
+        sqlite_session,
+        [
+            schemas.TaskCreate(title="First", project_id=project.id),
+            schemas.TaskCreate(title="Orphan", project_id=999),
+            schemas.TaskCreate(title="Second", project_id=project.id, priority=1),
+        ],
+    )
+
+    assert [item.index for item in result.created] == [0, 2]
+    assert [(err.index, err.detail) for err in result.errors] == [(1, "Project 999 not found")]
+    created = {t.id: t for t in crud.list_tasks(sqlite_session)}
+    assert created[result.created[1].id].title == "Second"
+    assert created[result.created[1].id].priority == 1
+
+
+@pytest.mark.unit
+def test_bulk_create_tasks_reports_projects_deleted_during_insert(sqlite_session, monkeypatch):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Survives"))
+    lookup = crud._live_project_ids
+    stale = iter([{project.id, 998}])  # 998 passes the lookup but is gone by the INSERT
+    monkeypatch.setattr(crud, "_live_project_ids", lambda db, ids: next(stale, None) or lookup(db, ids))
+
+    result = crud.bulk_create_tasks(
+        sqlite_session,
+        [
+            schemas.TaskCreate(title="Kept", project_id=project.id),
+            schemas.TaskCreate(title="Raced", project_id=998),
+        ],
+    )
+
+    assert [item.index for item in result.created] == [0]
+    assert [(err.index, err.detail) for err in result.errors] == [(1, "Project 998 not found")]
+    assert crud.get_task_metrics(sqlite_session).total == 1
+
+
+@pytest.mark.unit
+def test_bulk_update_tasks_by_filter_touches_updated_at(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Sprint"))
+    todo = crud.create_task(sqlite_session, schemas.TaskCreate(title="Open", project_id=project.id))
+    done = crud.create_task(
+        sqlite_session, schemas.TaskCreate(title="Closed", project_id=project.id, status=TaskStatus.DONE)
+    )
+    before = todo.updated_at
+
+    result = crud.bulk_update_tasks(
+        sqlite_session,
+        schemas.TaskBulkUpdate(
+            filter={"project_id": project.id, "status": TaskStatus.TODO},
+            changes={"status": TaskStatus.DONE},
+        ),
+    )
+
+    assert result.updated == [todo.id]
+    refreshed = crud.get_task(sqlite_session, todo.id)
+    assert refreshed.status == TaskStatus.DONE
+    assert refreshed.updated_at > before
+    assert crud.get_task(sqlite_session, done.id).status == TaskStatus.DONE
+
+
+@pytest.mark.unit
+def test_bulk_update_requires_single_target():
+    with pytest.raises(ValidationError):
+        schemas.TaskBulkUpdate(ids=[1], filter={"status": "TODO"}, changes={"priority": 1})
+    with pytest.raises(ValidationError):
+        schemas.TaskBulkUpdate(ids=[1], changes={})
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("field", ["title", "status", "priority", "project_id"])
+def test_bulk_update_rejects_null_changes(field):
+    with pytest.raises(ValidationError, match=f"{field} may not be null"):
+        schemas.TaskBulkUpdate(ids=[1], changes={field: None})
+    assert schemas.TaskBulkUpdate(ids=[1], changes={"description": None, "due_date": None})
+
+
+@pytest.mark.unit
+def test_task_counters_follow_writes(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Counted"))
+    other = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Other"))
+    task = crud.create_task(sqlite_session, schemas.TaskCreate(title="Single", project_id=project.id))
+    crud.bulk_create_tasks(
+        sqlite_session,
+        [schemas.TaskCreate(title=f"Bulk {i}", project_id=project.id, priority=1) for i in range(3)],
+    )
+    crud.update_task(sqlite_session, task.id, schemas.TaskUpdate(status=TaskStatus.IN_PROGRESS))
+    crud.bulk_update_tasks(
+        sqlite_session,
+        schemas.TaskBulkUpdate(filter={"project_id": project.id, "status": "TODO"}, changes={"status": "DONE"}),
+    )
+    moved = crud.list_tasks(sqlite_session, project_id=project.id)[0]
+    crud.update_task(sqlite_session, moved.id, schemas.TaskUpdate(project_id=other.id))
+    crud.delete_task(sqlite_session, task.id)
+
+    metrics = crud.get_task_metrics(sqlite_session, project.id)
+    assert metrics.total == 2
+    assert metrics.by_status == {TaskStatus.TODO: 0, TaskStatus.IN_PROGRESS: 0, TaskStatus.DONE: 2}
+    assert metrics.by_priority == {1: 2, 2: 0, 3: 0, 4: 0, 5: 0}
+    assert crud.get_task_metrics(sqlite_session).total == 3
+
+
+@pytest.mark.unit
+def test_task_metrics_overdue_and_rebuild(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Late"))
+    for status in (TaskStatus.TODO, TaskStatus.DONE):
+        crud.create_task(
+            sqlite_session,
+            schemas.TaskCreate(title="Past due", project_id=project.id, status=status, due_date=date(2000, 1, 1)),
+        )
+    crud.create_task(sqlite_session, schemas.TaskCreate(title="No due date", project_id=project.id))
+
+    crud.rebuild_task_counters(sqlite_session)
+    metrics = crud.get_task_metrics(sqlite_session, project.id)
+
+    assert metrics.overdue == 1
+    assert metrics.total == 3
+    assert metrics.by_status[TaskStatus.DONE] == 1
+
+
+@pytest.mark.unit
+def test_async_session_round_trip():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(bind=engine, expire_on_commit=False)() as session:
+            db = Database(session)  # the routes' handle, as in async mode
+            project = await db.run(crud.create_project, schemas.ProjectCreate(name="Async"))
+            task = await db.run(crud.create_task, schemas.TaskCreate(title="Await me", project_id=project.id))
+            await db.run(crud.update_task, task.id, schemas.TaskUpdate(status=TaskStatus.DONE))
+            tasks = await db.run(crud.list_tasks, project_id=project.id)
+            metrics = await db.run(crud.get_task_metrics, project.id)
+        await engine.dispose()
+        return tasks, metrics
+
+    tasks, metrics = asyncio.run(scenario())
+    assert [(t.title, t.status, t.project.name) for t in tasks] == [("Await me", TaskStatus.DONE, "Async")]
+    assert metrics.by_status[TaskStatus.DONE] == 1
+
+
+@pytest.mark.unit
+def test_stream_task_rows_export_formats(sqlite_session):
+    project = crud.create_project(sqlite_session, schemas.ProjectCreate(name="Exported"))
+    for i in range(5):
+        crud.create_task(
+            sqlite_session, schemas.TaskCreate(title=f"Row {i}, quoted", project_id=project.id, due_date=date(2030, 1, 1))
+        )
+
+    batches = list(crud.stream_task_rows(sqlite_session.get_bind(), project.id, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+    lines = "".join(export.stream(batches, export.DataFormat.CSV)).splitlines()
+    assert lines[0] == ",".join(export.EXPORT_COLUMNS)
+    assert len(lines) == 6
+    assert '"Row 0, quoted"' in lines[1] and ",TODO,3,2030-01-01," in lines[1]
+    assert "".join(export.stream([], export.DataFormat.CSV)).strip() == ",".join(export.EXPORT_COLUMNS)
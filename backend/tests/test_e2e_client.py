@@ -4,6 +4,8 @@ from uuid import uuid4
 import httpx
 import pytest
 
+import load_client
+
 BASE_URL = os.getenv("E2E_BASE_URL")
 
 if not BASE_URL:
@@ -85,3 +87,20 @@ def test_create_multiple_tasks_end_to_end():
             client.post("/tasks", json={"title": f"Task {idx}", "project_id": project_id})
         tasks = client.get("/tasks", params={"project_id": project_id}).json()
         assert len(tasks) >= 3
+
+
+@pytest.mark.e2e
+def test_load_smoke_end_to_end(tmp_path):
+    report_path = tmp_path / "load.json"
+    exit_code = load_client.main(
+        [
+            "--base-url", BASE_URL,
+            "--duration", "2",
+            "--concurrency", "4",
+            "--mix", "list_tasks=2,get_task=2,create_task=1,update_task=1",
+            "--output", str(report_path),
+            "--max-error-rate", "0",
+        ]
+    )
+    assert exit_code == 0
+    assert report_path.read_text()
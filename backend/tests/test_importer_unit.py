@@ -0,0 +1,83 @@
+import io
+import json
+
+import pytest
+
+from app import crud, importer
+from app.export import DataFormat
+from app.importer import ImportKind, OnConflict
+from app.models import TaskStatus
+
+
+@pytest.mark.unit
+def test_import_projects_handles_name_conflicts(sqlite_session):
+    crud.create_project(sqlite_session, crud.schemas.ProjectCreate(name="Existing", description="old"))
+    lines = ["name,description\n", "Existing,new\n", "Fresh,\n", "Fresh,again\n", "No,\n"]
+
+    result = importer.run_import(sqlite_session.get_bind(), lines, ImportKind.PROJECTS, DataFormat.CSV, chunk_size=2)
+
+    assert (result.rows, result.imported, result.skipped, result.failed) == (4, 1, 2, 1)
+    assert result.errors[0].index == 3
+    projects = {p.name: p.description for p in crud.list_projects(sqlite_session)}
+    assert projects == {"Existing": "old", "Fresh": None}
+
+
+@pytest.mark.unit
+def test_import_projects_update_on_conflict(sqlite_session):
+    crud.create_project(sqlite_session, crud.schemas.ProjectCreate(name="Existing", description="old"))
+    lines = ['{"name": "Existing", "description": "new"}\n', '{"name": "Existing", "description": "newer"}\n']
+
+    result = importer.run_import(sqlite_session.get_bind(), lines, ImportKind.PROJECTS, on_conflict=OnConflict.UPDATE)
+
+    assert (result.imported, result.skipped) == (1, 1)
+    sqlite_session.expire_all()
+    assert crud.list_projects(sqlite_session)[0].description == "newer"
+
+
+@pytest.mark.unit
+def test_import_tasks_resolves_project_names(sqlite_session):
+    project = crud.create_project(sqlite_session, crud.schemas.ProjectCreate(name="Target"))
+    records = [
+        {"title": "By name", "project_name": "Target", "status": "DONE", "due_date": "2030-01-01"},
+        {"title": "By id", "project_id": project.id, "priority": 5},
+        {"title": "Unknown", "project_name": "Missing"},
+        {"title": "Both", "project_id": project.id, "project_name": "Target"},
+    ]
+    lines = [json.dumps(record) + "\n" for record in records] + ["{not json\n"]
+    reports = []
+
+    result = importer.run_import(
+        sqlite_session.get_bind(), lines, ImportKind.TASKS, chunk_size=3, progress=lambda r: reports.append(r.rows)
+    )
+
+    assert (result.rows, result.imported, result.failed) == (5, 2, 3)
+    assert reports == [3, 5]
+    assert sorted(error.index for error in result.errors) == [2, 3, 4]
+    tasks = {task.title: task for task in crud.list_tasks(sqlite_session)}
+    assert tasks["By name"].status is TaskStatus.DONE and tasks["By id"].priority == 5
+    metrics = crud.get_task_metrics(sqlite_session, project.id)
+    assert (metrics.total, metrics.by_status[TaskStatus.DONE], metrics.by_priority[5]) == (2, 1, 1)
+
+
+@pytest.mark.unit
+def test_import_reports_malformed_csv_rows(sqlite_session):
+    lines = ["name,description\n", "Extra,one,two\n", "Bare\rreturn,x\n", "Kept,\n"]
+
+    result = importer.run_import(sqlite_session.get_bind(), lines, ImportKind.PROJECTS, DataFormat.CSV)
+
+    assert (result.rows, result.imported, result.failed) == (3, 1, 2)
+    assert [error.index for error in result.errors] == [0, 1]
+    assert "3 fields, the header has 2" in result.errors[0].detail
+    assert [project.name for project in crud.list_projects(sqlite_session)] == ["Kept"]
+
+
+@pytest.mark.unit
+def test_import_reports_input_that_is_not_utf8(sqlite_session):
+    upload = io.BytesIO(b'{"name": "Caf\xe9"}\n')
+    lines = io.TextIOWrapper(upload, encoding="utf-8", newline="")
+
+    result = importer.run_import(sqlite_session.get_bind(), lines, ImportKind.PROJECTS)
+
+    assert (result.rows, result.imported, result.failed) == (1, 0, 1)
+    assert "can't decode" in result.errors[0].detail
+    assert crud.list_projects(sqlite_session) == []
@@ -0,0 +1,70 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from load_client import LoadState, parse_mix, percentile, run_load
+
+
+@pytest.mark.unit
+def test_percentile_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.95) == 95.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([7.0], 0.99) == 7.0
+    assert percentile([], 0.5) == 0.0
+
+
+@pytest.mark.unit
+def test_parse_mix():
+    assert parse_mix("list_tasks=3, get_task") == {"list_tasks": 3, "get_task": 1}
+    with pytest.raises(ValueError, match="unknown operation"):
+        parse_mix("list_tasks=1,drop_tables=1")
+    with pytest.raises(ValueError, match="positive weight"):
+        parse_mix("list_tasks=0")
+
+
+@pytest.mark.unit
+def test_deletes_take_only_idle_tasks_above_the_floor():
+    state = LoadState(project_ids=[1], task_ids=[10, 11, 12], rng=random.Random(0))
+
+    with state.task() as held:
+        taken = {state.take_task(), state.take_task()}
+        assert held not in taken and state.task_ids == [held]
+    assert state.take_task() is None  # one task per project stays
+    assert not state.leases
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("client", ["sync"], indirect=True)
+@pytest.mark.parametrize("rate", [None, 50.0])
+def test_run_load_reports_per_endpoint(client, rate):
+    async def run():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as load_client:
+            return await run_load(
+                load_client,
+                mix={"list_tasks": 1, "get_task": 1, "create_task": 1, "update_task": 1, "delete_task": 2},
+                duration=0.5,
+                concurrency=4,
+                rate=rate,
+                projects=2,
+                tasks_per_project=5,
+                seed_value=1,
+            )
+
+    report = asyncio.run(run())
+
+    assert report["mode"] == ("rate" if rate else "concurrency")
+    assert set(report["endpoints"]) == {"list_tasks", "get_task", "create_task", "update_task", "delete_task"}
+    assert report["total"]["requests"] == sum(item["requests"] for item in report["endpoints"].values())
+    assert report["total"]["error_rate"] == 0.0
+    assert report["endpoints"]["create_task"]["status_codes"] == {
+        "201": report["endpoints"]["create_task"]["requests"]
+    }
+    latency = report["total"]["latency_ms"]
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    assert client.get("/projects").json() == []  # seeded projects are cleaned up
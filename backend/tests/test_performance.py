@@ -1,6 +1,13 @@
+import json
+from datetime import date, timedelta
+
 import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, text
 
-from app import crud, schemas
+from app import crud, importer, schemas, serialization
+from app.models import TaskStatus
 
 
 @pytest.mark.benchmark
@@ -69,3 +76,321 @@ def test_delete_task_performance(db_session, benchmark):
         return True
 
     assert benchmark(delete_task)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("path", ["pydantic", "fast"])
+def test_list_tasks_serialization_performance(db_session, benchmark, path):
+    """Fetch and encode a 500-task page: per-row TaskOut models vs flat rows to JSON bytes."""
+    project = crud.create_project(db_session, schemas.ProjectCreate(name="BenchJson"))
+    crud.bulk_create_tasks(
+        db_session, [schemas.TaskCreate(title=f"Json {i}", project_id=project.id) for i in range(500)]
+    )
+    benchmark.group = "list-serialization"
+
+    def pydantic_page():
+        tasks = crud.list_tasks(db_session, limit=500)
+        content = jsonable_encoder([schemas.TaskOut.from_orm(task) for task in tasks])
+        return JSONResponse(content).body
+
+    def fast_page():
+        return serialization.encode_tasks(crud.list_task_rows(db_session, limit=500))
+
+    body = benchmark(pydantic_page if path == "pydantic" else fast_page)
+
+    assert len(json.loads(body)) == 500
+
+
+@pytest.mark.benchmark
+def test_delete_project_query_count(db_session, query_counter):
+    project = crud.create_project(db_session, schemas.ProjectCreate(name="BenchCascade"))
+    crud.bulk_create_tasks(
+        db_session, [schemas.TaskCreate(title=f"Cascade {i}", project_id=project.id) for i in range(2000)]
+    )
+
+    query_counter.clear()
+    assert crud.delete_project(db_session, project.id) is False
+
+    # Size check and one DELETE; the foreign keys cascade to tasks and counters.
+    assert len(query_counter) == 2, query_counter
+    assert crud.list_tasks(db_session, project.id) == []
+
+
+@pytest.mark.benchmark
+def test_purge_deleted_project_in_chunks(db_session, query_counter, monkeypatch):
+    monkeypatch.setattr(crud, "PROJECT_PURGE_THRESHOLD", 100)
+    project = crud.create_project(db_session, schemas.ProjectCreate(name="BenchPurge"))
+    crud.bulk_create_tasks(
+        db_session, [schemas.TaskCreate(title=f"Purge {i}", project_id=project.id) for i in range(1000)]
+    )
+    assert crud.delete_project(db_session, project.id) is True
+
+    query_counter.clear()
+    assert crud.purge_deleted_projects(db_session, chunk_size=300) == 1000
+
+    deletes = [statement for statement in query_counter if statement.startswith("DELETE FROM tasks")]
+    assert len(deletes) == 4  # 300 + 300 + 300 + 100
+    assert db_session.execute(text("SELECT count(*) FROM tasks")).scalar_one() == 0
+    assert db_session.execute(text("SELECT count(*) FROM projects")).scalar_one() == 0
+
+
+@pytest.mark.benchmark
+def test_list_tasks_query_count(client, query_counter):
+    for i in range(10):
+        project = client.post("/projects", json={"name": f"Count {i}"}).json()
+        client.post("/tasks", json={"title": f"Task {i}", "project_id": project["id"]})
+
+    query_counter.clear()
+    response = client.get("/tasks")
+
+    assert response.status_code == 200
+    assert len({task["project"]["id"] for task in response.json()}) == 10
+    assert len(query_counter) == 2, query_counter  # ETag fingerprint + page
+
+    query_counter.clear()
+    revalidated = client.get("/tasks", headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert len(query_counter) == 1, query_counter
+
+
+@pytest.mark.benchmark
+def test_sync_query_count(client, query_counter):
+    for i in range(5):
+        project = client.post("/projects", json={"name": f"Sync {i}"}).json()
+        client.post("/tasks", json={"title": f"Sync task {i}", "project_id": project["id"]})
+        if i % 2:
+            client.delete(f"/projects/{project['id']}")
+
+    query_counter.clear()
+    response = client.get("/sync")
+
+    assert response.status_code == 200
+    assert len(response.json()["deleted"]["projects"]) == 2
+    assert len(query_counter) == 3, query_counter  # projects, tasks, deletions
+
+
+@pytest.mark.benchmark
+def test_sparse_fields_skip_project_join(client, query_counter):
+    project = client.post("/projects", json={"name": "Narrow"}).json()
+    client.post("/tasks", json={"title": "Narrow task", "project_id": project["id"]})
+
+    query_counter.clear()
+    response = client.get("/tasks", params={"fields": "id,title,status"})
+
+    assert response.json()[0]["title"] == "Narrow task"
+    page = query_counter[-1]
+    assert "JOIN projects" not in page
+    assert "tasks.description" not in page
+
+
+@pytest.mark.benchmark
+def test_batch_get_query_count(client, query_counter):
+    project = client.post("/projects", json={"name": "BatchCount"}).json()
+    tasks = client.post(
+        "/tasks/bulk", json=[{"title": f"Batch {i}", "project_id": project["id"]} for i in range(200)]
+    ).json()["created"]
+    ids = [task["id"] for task in tasks]
+
+    query_counter.clear()
+    response = client.post("/tasks/batch-get", json={"ids": ids})
+
+    assert len(response.json()["items"]) == 200
+    assert len(query_counter) == 1, query_counter
+    assert "= ANY (" in query_counter[0]
+
+
+@pytest.mark.benchmark
+def test_project_with_tasks_query_count(client, query_counter):
+    project = client.post("/projects", json={"name": "Embedded"}).json()
+    for i in range(20):
+        client.post("/tasks", json={"title": f"Embedded {i}", "project_id": project["id"]})
+
+    query_counter.clear()
+    response = client.get(f"/projects/{project['id']}", params={"include": "tasks", "limit": 10})
+
+    assert response.status_code == 200
+    assert len(response.json()["tasks"]) == 10
+    assert len(query_counter) == 1, query_counter
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("method", ["get", "post", "put", "delete"])
+def test_single_task_query_count(client, query_counter, method):
+    project = client.post("/projects", json={"name": "Counted"}).json()
+    task = client.post("/tasks", json={"title": "Counted task", "project_id": project["id"]}).json()
+
+    # Writes are one INSERT/UPDATE/DELETE ... RETURNING, with the counter upsert and
+    # the project join carried as CTEs.
+    query_counter.clear()
+    if method == "get":
+        response = client.get(f"/tasks/{task['id']}")
+    elif method == "post":
+        response = client.post("/tasks", json={"title": "Another", "project_id": project["id"]})
+    elif method == "put":
+        response = client.put(f"/tasks/{task['id']}", json={"status": "DONE"})
+    else:
+        response = client.delete(f"/tasks/{task['id']}")
+
+    assert response.status_code == {"post": 201, "delete": 204}.get(method, 200)
+    if method != "delete":
+        assert response.json()["project"]["name"] == "Counted"
+    assert len(query_counter) == 1, query_counter
+
+
+@pytest.mark.benchmark
+def test_bulk_create_tasks_performance(db_session, query_counter, benchmark):
+    project = crud.create_project(db_session, schemas.ProjectCreate(name="BenchBulk"))
+    tasks_in = [schemas.TaskCreate(title=f"Bulk {i}", project_id=project.id) for i in range(10_000)]
+
+    query_counter.clear()
+    result = benchmark.pedantic(crud.bulk_create_tasks, args=(db_session, tasks_in), rounds=3)
+
+    assert len(result.created) == 10_000
+    assert not result.errors
+    # Project lookup, batched INSERT ... RETURNING statements and one counter upsert, per round.
+    assert len(query_counter) <= 3 * (1 + 10 + 1)
+
+
+@pytest.mark.benchmark
+def test_bulk_update_tasks_performance(db_session, query_counter, benchmark):
+    project = crud.create_project(db_session, schemas.ProjectCreate(name="BenchBulkUpdate"))
+    crud.bulk_create_tasks(
+        db_session, [schemas.TaskCreate(title=f"Bulk {i}", project_id=project.id) for i in range(1000)]
+    )
+    bulk_in = schemas.TaskBulkUpdate(filter={"project_id": project.id}, changes={"status": "DONE"})
+
+    query_counter.clear()
+    result = benchmark.pedantic(crud.bulk_update_tasks, args=(db_session, bulk_in), rounds=5)
+
+    assert len(result.updated) == 1000
+    # Row lock, UPDATE ... FROM and counter upsert in one statement per round.
+    assert len(query_counter) == 5
+
+
+@pytest.mark.benchmark
+def test_task_metrics_performance(db_session, query_counter, benchmark):
+    project = crud.create_project(db_session, schemas.ProjectCreate(name="BenchMetrics"))
+    crud.bulk_create_tasks(
+        db_session,
+        [schemas.TaskCreate(title=f"Bulk {i}", project_id=project.id, priority=i % 5 + 1) for i in range(1000)],
+    )
+
+    query_counter.clear()
+    metrics = benchmark(crud.get_task_metrics, db_session, project.id)
+
+    assert metrics.total == 1000
+    assert not any("FROM tasks GROUP BY" in statement for statement in query_counter)
+
+
+@pytest.mark.benchmark
+def test_export_tasks_streams_in_batches(db_session, query_counter, benchmark):
+    project = crud.create_project(db_session, schemas.ProjectCreate(name="BenchExport"))
+    crud.bulk_create_tasks(
+        db_session, [schemas.TaskCreate(title=f"Export {i}", project_id=project.id) for i in range(5000)]
+    )
+
+    def export_all():
+        return [len(batch) for batch in crud.stream_task_rows(db_session.get_bind(), batch_size=1000)]
+
+    query_counter.clear()
+    batch_sizes = benchmark.pedantic(export_all, rounds=3)
+
+    assert batch_sizes == [1000] * 5
+    # One server-side cursor per export, fetched batch by batch.
+    assert len(query_counter) == 3
+
+
+@pytest.mark.benchmark
+def test_import_tasks_performance(db_session, benchmark):
+    crud.create_project(db_session, schemas.ProjectCreate(name="BenchImport"))
+    lines = [json.dumps({"title": f"Imported {i}", "project_name": "BenchImport"}) + "\n" for i in range(20_000)]
+
+    result = benchmark.pedantic(
+        importer.run_import, args=(db_session.get_bind(), lines, importer.ImportKind.TASKS), rounds=3
+    )
+
+    assert result.imported == 20_000
+    benchmark.extra_info["rows_per_second"] = round(result.rows_per_second)
+
+
+@pytest.mark.benchmark
+def test_search_tasks_performance(db_session, benchmark):
+    project = crud.create_project(db_session, schemas.ProjectCreate(name="BenchSearch"))
+    words = ["deploy", "backup", "invoice", "report", "migration", "review", "budget", "release"]
+    crud.bulk_create_tasks(
+        db_session,
+        [
+            schemas.TaskCreate(
+                title=f"{words[i % 8]} item {i}", description=f"{words[(i * 3) % 8]} notes", project_id=project.id
+            )
+            for i in range(20_000)
+        ]
+        + [schemas.TaskCreate(title="quarterly audit", project_id=project.id)],
+    )
+
+    rows = benchmark(crud.search_tasks, db_session, "audit", limit=20)
+
+    assert [row.Task.title for row in rows] == ["quarterly audit"]
+    # At this size a seq scan may still be cheaper; check the predicate can use the GIN index.
+    db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db_session.execute(
+        text("EXPLAIN SELECT id FROM tasks WHERE search_vector @@ websearch_to_tsquery('simple', 'audit')")
+    ).scalars().all()
+    assert any("ix_tasks_search_vector" in line for line in plan), plan
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "filters",
+    [{"statuses": [TaskStatus.IN_PROGRESS]}, {"sort": "-priority"}, {"sort": "due_date"}, {"sort": "-updated_at"}],
+)
+def test_filtered_task_lists_use_indexes(db_session, benchmark, filters):
+    projects = [crud.create_project(db_session, schemas.ProjectCreate(name=f"BenchBoard {i}")) for i in range(2)]
+    crud.bulk_create_tasks(
+        db_session,
+        [
+            schemas.TaskCreate(
+                title=f"Board {i}",
+                project_id=projects[i % 2].id,
+                status=list(TaskStatus)[i % 3],
+                priority=i % 5 + 1,
+                due_date=date(2030, 1, 1) + timedelta(days=i % 365),
+            )
+            for i in range(10_000)
+        ],
+    )
+    db_session.execute(text("ANALYZE tasks"))
+    statements = []
+    listener = lambda conn, cursor, statement, params, context, many: statements.append((statement, params))
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+
+    tasks = benchmark(crud.list_tasks, db_session, projects[0].id, limit=101, **filters)
+
+    event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    assert len(tasks) == 101
+    statement, params = statements[-1]
+    plan = "\n".join(row[0] for row in db_session.connection().exec_driver_sql("EXPLAIN " + statement, params))
+    # The page is read in index order: no sort of the project's tasks.
+    assert "Index Scan" in plan and "Sort" not in plan, plan
+
+
+@pytest.mark.benchmark
+def test_list_tasks_http_performance(client, benchmark):
+    project = client.post("/projects", json={"name": "BenchHttp"}).json()
+    client.post(
+        "/tasks/bulk", json=[{"title": f"Task {i}", "project_id": project["id"]} for i in range(100)]
+    )
+
+    response = benchmark(client.get, "/tasks", params={"project_id": project["id"]})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 100
+
+
+@pytest.mark.benchmark
+def test_create_task_http_performance(client, benchmark):
+    project = client.post("/projects", json={"name": "BenchHttpCreate"}).json()
+
+    response = benchmark(client.post, "/tasks", json={"title": "Bench task", "project_id": project["id"]})
+
+    assert response.status_code == 201
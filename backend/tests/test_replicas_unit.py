@@ -0,0 +1,78 @@
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+from starlette.requests import Request
+
+from app import database
+from app.replicas import READ_PRIMARY_COOKIE, READ_PRIMARY_UNTIL_HEADER, ReplicaRouter, wants_primary
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+def test_router_round_robin_skips_replicas_marked_down():
+    clock = FakeClock()
+    router = ReplicaRouter(["a", "b", "c"], retry_after=30, clock=clock)
+    assert [router.pick() for _ in range(4)] == ["a", "b", "c", "a"]
+
+    router.mark_down("c")
+    assert [router.pick() for _ in range(3)] == ["b", "a", "b"]
+
+    clock.now = 31
+    assert [router.pick() for _ in range(3)] == ["c", "a", "b"]
+
+
+@pytest.mark.unit
+def test_router_without_healthy_replicas():
+    router = ReplicaRouter(["a"], retry_after=30, clock=FakeClock())
+    router.mark_down("a")
+    assert router.pick() is None
+    assert not ReplicaRouter([])
+
+
+@pytest.mark.unit
+def test_wants_primary_after_recent_write_or_on_request():
+    assert wants_primary({"x-read-primary": "1"}, {})
+    assert wants_primary({}, {READ_PRIMARY_COOKIE: str(time.time() + 5)})
+    assert not wants_primary({}, {READ_PRIMARY_COOKIE: str(time.time() - 1)})
+    assert not wants_primary({}, {READ_PRIMARY_COOKIE: "garbage"})
+    assert wants_primary({READ_PRIMARY_UNTIL_HEADER: str(time.time() + 5)}, {})
+    assert not wants_primary({READ_PRIMARY_UNTIL_HEADER: str(time.time() - 1)}, {})
+    assert wants_primary({READ_PRIMARY_UNTIL_HEADER: "garbage"}, {READ_PRIMARY_COOKIE: str(time.time() + 5)})
+    assert not wants_primary({}, {})
+
+
+@pytest.mark.unit
+def test_replica_that_dies_with_a_warm_pool_is_skipped(monkeypatch):
+    connections, down = [], False
+
+    def connect():
+        if down:
+            raise sqlite3.OperationalError("unable to open database file")
+        connections.append(sqlite3.connect(":memory:", check_same_thread=False))
+        return connections[-1]
+
+    replica = create_engine("sqlite://", creator=connect, poolclass=QueuePool, **database.REPLICA_POOL_OPTIONS)
+    router = ReplicaRouter([replica], retry_after=30, clock=FakeClock())
+    monkeypatch.setattr(database, "replica_router", router)
+    request = Request({"type": "http", "headers": []})
+
+    session = database._replica_session(request)
+    assert session.execute(text("SELECT 1")).scalar() == 1
+    session.close()  # the connection goes back to the pool
+
+    down = True
+    for connection in connections:
+        connection.close()
+
+    assert database._replica_session(request) is None
+    assert router.pick() is None
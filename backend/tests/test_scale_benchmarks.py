@@ -0,0 +1,304 @@
+"""Benchmarks on seeded 1k / 100k / 1M task datasets, gated against a stored baseline.
+
+Only the 1k dataset runs by default; `BENCH_SCALES=1k,100k,1m` adds the larger ones
+(seeding 1M tasks takes a minute or more). Every benchmark records the statements one call
+issues and fails when that count grows past the baseline in `benchmark_baseline.json`.
+Timings are machine-specific, so they are only gated on request: on the reference machine,
+`BENCH_MAX_SLOWDOWN=3` also fails a median over three times the baseline, and
+`BENCH_UPDATE_BASELINE=1 BENCH_SCALES=1k,100k,1m pytest tests/test_scale_benchmarks.py`
+refreshes it.
+"""
+import itertools
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.database import Base, get_db
+from app.main import create_app
+from app.models import TaskStatus
+
+pytestmark = pytest.mark.benchmark
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+ENABLED_SCALES = set(os.getenv("BENCH_SCALES", "1k").split(","))
+TASKS_PER_PROJECT = 100
+
+BASELINE_PATH = Path(__file__).with_name("benchmark_baseline.json")
+# Allowed median slowdown over the baseline; 0 (the default, for shared CI runners) checks
+# statement counts only.
+MAX_SLOWDOWN = float(os.getenv("BENCH_MAX_SLOWDOWN", "0"))
+UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE", "0") == "1"
+
+SEED_PROJECTS = text(
+    """
+    INSERT INTO projects (name, description, created_at, updated_at)
+    SELECT 'Project ' || g, 'Seeded project', now() - g * interval '1 hour', now()
+    FROM generate_series(1, :projects) AS g
+    """
+)
+# Tasks are dealt to projects round-robin; statuses, priorities and due dates cycle
+# within each project, so every filter matches a predictable share of it.
+SEED_TASKS = text(
+    """
+    INSERT INTO tasks (title, description, status, priority, due_date, created_at, updated_at, project_id)
+    SELECT
+        'Task ' || g,
+        'Seeded task ' || g || ' for the scale benchmarks',
+        (ARRAY['TODO', 'IN_PROGRESS', 'DONE'])[1 + g / :projects % 3]::taskstatus,
+        1 + g / :projects % 5,
+        current_date + (g / :projects % 60 - 30),
+        now() - g * interval '1 second',
+        now() - g * interval '1 second',
+        first.id + g % :projects
+    FROM generate_series(1, :tasks) AS g, (SELECT min(id) AS id FROM projects) AS first
+    """
+)
+
+
+@dataclass
+class Dataset:
+    name: str
+    engine: Engine
+    tasks: int
+    project_ids: List[int]
+
+
+@pytest.fixture(scope="module", params=list(SCALES))
+def dataset(request, scale_postgres_url):
+    if request.param not in ENABLED_SCALES:
+        pytest.skip(f"set BENCH_SCALES to include {request.param}")
+    tasks = SCALES[request.param]
+    engine = create_engine(scale_postgres_url, future=True)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine, future=True)() as db:
+        db.execute(SEED_PROJECTS, {"projects": tasks // TASKS_PER_PROJECT})
+        db.execute(SEED_TASKS, {"projects": tasks // TASKS_PER_PROJECT, "tasks": tasks})
+        db.commit()
+        crud.rebuild_task_counters(db)
+        project_ids = list(db.scalars(select(models.Project.id).order_by(models.Project.id)))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+    yield Dataset(request.param, engine, tasks, project_ids)
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def scale_db(dataset):
+    with sessionmaker(bind=dataset.engine, autoflush=False, future=True)() as db:
+        yield db
+
+
+@pytest.fixture
+def scale_client(dataset):
+    """Sync API client on the seeded database."""
+    factory = sessionmaker(bind=dataset.engine, autoflush=False, autocommit=False, future=True)
+
+    def _get_scale_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = create_app(async_mode=False)
+    app.state.skip_db_init = True
+    app.dependency_overrides[get_db] = _get_scale_db
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    """Stored results; with BENCH_UPDATE_BASELINE=1 this run's results are merged back in."""
+    stored = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    measured = {}
+    yield stored, measured
+    if UPDATE_BASELINE and measured:
+        BASELINE_PATH.write_text(json.dumps({**stored, **measured}, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture
+def gate(request, benchmark, baseline, dataset):
+    """Record a finished benchmark's statement count and check it against the baseline."""
+    stored, measured = baseline
+
+    def check(queries: int) -> None:
+        benchmark.extra_info["queries"] = queries
+        benchmark.extra_info["tasks"] = dataset.tasks
+        median = benchmark.stats.stats.median if benchmark.stats else None
+        if UPDATE_BASELINE:
+            measured[request.node.name] = {"queries": queries, "median": round(median, 6)}
+            return
+        expected = stored.get(request.node.name)
+        if expected is None:
+            return
+        assert queries <= expected["queries"], (
+            f"{request.node.name} issues {queries} statements, baseline {expected['queries']}"
+        )
+        if MAX_SLOWDOWN and median is not None and expected["median"]:
+            assert median <= expected["median"] * MAX_SLOWDOWN, (
+                f"{request.node.name} median {median * 1000:.2f} ms, "
+                f"baseline {expected['median'] * 1000:.2f} ms (limit x{MAX_SLOWDOWN:g})"
+            )
+
+    return check
+
+
+@contextmanager
+def counting(engine: Engine):
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def count_queries(engine: Engine, call) -> int:
+    """Statements issued by one `call()`, run outside the timed rounds."""
+    with counting(engine) as statements:
+        call()
+    return len(statements)
+
+
+def middle_project(dataset: Dataset) -> int:
+    return dataset.project_ids[len(dataset.project_ids) // 2]
+
+
+def new_task_id(db, dataset: Dataset) -> int:
+    return crud.create_task(db, schemas.TaskCreate(title="Scratch", project_id=middle_project(dataset))).id
+
+
+def test_crud_list(scale_db, dataset, benchmark, gate):
+    def list_page():
+        return crud.list_tasks(scale_db, limit=50)
+
+    queries = count_queries(dataset.engine, list_page)
+    assert len(benchmark(list_page)) == 50
+    gate(queries)
+
+
+def test_crud_filter(scale_db, dataset, benchmark, gate):
+    def filter_page():
+        return crud.list_tasks(
+            scale_db,
+            project_id=middle_project(dataset),
+            statuses=[TaskStatus.DONE, TaskStatus.TODO],
+            priority_min=3,
+            limit=50,
+        )
+
+    queries = count_queries(dataset.engine, filter_page)
+    tasks = benchmark(filter_page)
+    assert tasks and all(task.priority >= 3 and task.status != TaskStatus.IN_PROGRESS for task in tasks)
+    gate(queries)
+
+
+def test_crud_create(scale_db, dataset, benchmark, gate):
+    task_in = schemas.TaskCreate(title="Benchmarked", project_id=middle_project(dataset))
+
+    def create():
+        return crud.create_task(scale_db, task_in)
+
+    queries = count_queries(dataset.engine, create)
+    assert benchmark(create).project_id == task_in.project_id
+    gate(queries)
+
+
+def test_crud_update(scale_db, dataset, benchmark, gate):
+    task_id = new_task_id(scale_db, dataset)
+    statuses = itertools.cycle(TaskStatus)
+
+    def update():
+        return crud.update_task(scale_db, task_id, schemas.TaskUpdate(status=next(statuses)))
+
+    queries = count_queries(dataset.engine, update)
+    assert benchmark(update).id == task_id
+    gate(queries)
+
+
+def test_crud_delete(scale_db, dataset, benchmark, gate):
+    def setup():
+        return (scale_db, new_task_id(scale_db, dataset)), {}
+
+    args, _ = setup()
+    queries = count_queries(dataset.engine, lambda: crud.delete_task(*args))
+    benchmark.pedantic(crud.delete_task, setup=setup, rounds=50)
+    gate(queries)
+
+
+def test_http_list(scale_client, dataset, benchmark, gate):
+    def list_page():
+        return scale_client.get("/tasks", params={"limit": 50})
+
+    queries = count_queries(dataset.engine, list_page)
+    response = benchmark(list_page)
+    assert response.status_code == 200 and len(response.json()) == 50
+    gate(queries)
+
+
+def test_http_filter(scale_client, dataset, benchmark, gate):
+    params = {
+        "project_id": middle_project(dataset),
+        "status": ["DONE", "TODO"],
+        "priority_min": 3,
+        "sort": "due_date",
+        "limit": 50,
+    }
+
+    def filter_page():
+        return scale_client.get("/tasks", params=params)
+
+    queries = count_queries(dataset.engine, filter_page)
+    response = benchmark(filter_page)
+    assert response.status_code == 200 and response.json()
+    gate(queries)
+
+
+def test_http_create(scale_client, dataset, benchmark, gate):
+    payload = {"title": "Benchmarked", "project_id": middle_project(dataset)}
+
+    def create():
+        return scale_client.post("/tasks", json=payload)
+
+    queries = count_queries(dataset.engine, create)
+    assert benchmark(create).status_code == 201
+    gate(queries)
+
+
+def test_http_update(scale_client, scale_db, dataset, benchmark, gate):
+    task_id = new_task_id(scale_db, dataset)
+    statuses = itertools.cycle(status.value for status in TaskStatus)
+
+    def update():
+        return scale_client.put(f"/tasks/{task_id}", json={"status": next(statuses)})
+
+    queries = count_queries(dataset.engine, update)
+    assert benchmark(update).status_code == 200
+    gate(queries)
+
+
+def test_http_delete(scale_client, scale_db, dataset, benchmark, gate):
+    def setup():
+        return (f"/tasks/{new_task_id(scale_db, dataset)}",), {}
+
+    (url,), _ = setup()
+    queries = count_queries(dataset.engine, lambda: scale_client.delete(url))
+    benchmark.pedantic(scale_client.delete, setup=setup, rounds=50)
+    gate(queries)
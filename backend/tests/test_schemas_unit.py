@@ -1,7 +1,7 @@
 import pytest
 from pydantic import ValidationError
 
-from app import schemas
+from app import etags, schemas
 from app.models import TaskStatus
 
 
@@ -37,3 +37,13 @@ def test_status_enum_values():
 def test_multiple_titles(title):
     payload = schemas.TaskCreate(title=title, project_id=1)
     assert payload.title == title
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "header, expected",
+    [('"abc"', True), ('W/"abc"', True), ('"x", "abc"', True), ("*", True), ('"abd"', False), (None, False)],
+)
+def test_etag_if_none_match(header, expected):
+    assert etags.matches(header, '"abc"') is expected
+    assert etags.matches(header, 'W/"abc"') is expected
@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app import telemetry
+from app.telemetry import Histogram, PoolMonitor, RequestMetrics, RequestTrace
+
+
+@pytest.mark.unit
+def test_histogram_cumulative_buckets():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot["buckets"] == {"0.1": 1, "1.0": 3, "+Inf": 4}
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == pytest.approx(4.25)
+
+
+@pytest.mark.unit
+def test_pool_monitor_tracks_checkouts_and_timeouts():
+    monitor = PoolMonitor("unit-test")
+    engine = create_engine(
+        "sqlite://",
+        poolclass=monitor.pool_class(QueuePool),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        busy = monitor.snapshot()
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    stats = monitor.snapshot()
+    assert busy["checked_out"] == 1
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["connections_opened"] == 2
+    assert stats["connections_closed"] == 1
+    assert stats["checkout_wait_seconds"]["count"] == 3
+
+
+@pytest.mark.unit
+def test_sql_hooks_attribute_statements_to_the_current_request():
+    telemetry.install_sql_hooks()
+    engine = create_engine("sqlite://")
+    trace = RequestTrace()
+
+    token = telemetry._current_trace.set(trace)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    finally:
+        telemetry._current_trace.reset(token)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 3"))
+
+    assert trace.queries == 2
+    assert [sql for _, sql in trace.statements] == ["SELECT 1", "SELECT 2"]
+    assert trace.db_seconds > 0
+
+
+@pytest.mark.unit
+def test_request_metrics_render_prometheus_text():
+    metrics = RequestMetrics()
+    trace = RequestTrace()
+    trace.queries = 3
+    metrics.started()
+    metrics.finished("GET", '/say/"{name}"', 200, 0.02, trace)
+
+    lines = metrics.render()
+
+    assert "http_requests_in_flight 0" in lines
+    assert 'http_requests_total{method="GET",route="/say/\\"{name}\\"",status="200"} 1' in lines
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/say/\\"{name}\\"",le="0.01"} 0' in lines
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/say/\\"{name}\\"",le="0.025"} 1' in lines
+    assert 'http_request_db_queries_sum{method="GET",route="/say/\\"{name}\\""} 3.0' in lines
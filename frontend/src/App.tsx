@@ -6,6 +6,7 @@ import ProjectForm from "./components/ProjectForm";
 import ProjectList from "./components/ProjectList";
 import TaskForm from "./components/TaskForm";
 import TaskList from "./components/TaskList";
+import { fetchMetrics } from "./store/metricsSlice";
 import { createProject, fetchProjects } from "./store/projectsSlice";
 import {
   createTask,
@@ -21,6 +22,7 @@ const App = () => {
   const dispatch = useAppDispatch();
   const { items: projects, status: projectsStatus } = useAppSelector((state) => state.projects);
   const { items: tasks, status: tasksStatus } = useAppSelector((state) => state.tasks);
+  const metrics = useAppSelector((state) => state.metrics.current);
   const [selectedProject, setSelectedProject] = useState<number | undefined>(undefined);
 
   useEffect(() => {
@@ -38,6 +40,11 @@ const App = () => {
     dispatch(setFilterProject(selectedProject));
   }, [dispatch, selectedProject]);
 
+  useEffect(() => {
+    // Counts come from the server-side counters; refresh them whenever the task list changes.
+    dispatch(fetchMetrics(selectedProject));
+  }, [dispatch, selectedProject, tasks]);
+
   const handleCreateProject = (name: string, description?: string) => {
     dispatch(createProject({ name, description }));
   };
@@ -103,7 +110,7 @@ const App = () => {
         </section>
 
         <section className="panel">
-          <Metrics tasks={tasks} />
+          <Metrics metrics={metrics} />
         </section>
       </main>
     </div>
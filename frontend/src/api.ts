@@ -1,6 +1,8 @@
 import axios from "axios";
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
+// Set on writes while read replicas are in use; echoed back so reads see our own writes.
+const READ_PRIMARY_UNTIL = "x-read-primary-until";
 
 export const api = axios.create({
   baseURL: API_BASE_URL,
@@ -8,3 +10,22 @@ export const api = axios.create({
     "Content-Type": "application/json",
   },
 });
+
+// Cross-origin requests carry no cookies, so the API's sticky-primary cookie never comes back.
+// The server checks the deadline itself, so a skewed local clock does not matter.
+let readPrimaryUntil: string | undefined;
+
+api.interceptors.response.use((response) => {
+  const until = response.headers[READ_PRIMARY_UNTIL] as string | undefined;
+  if (until) {
+    readPrimaryUntil = until;
+  }
+  return response;
+});
+
+api.interceptors.request.use((config) => {
+  if (readPrimaryUntil) {
+    config.headers.set(READ_PRIMARY_UNTIL, readPrimaryUntil);
+  }
+  return config;
+});
@@ -1,13 +1,14 @@
-import type { Task } from "../types";
+import type { TaskMetrics } from "../types";
 
 interface Props {
-  tasks: Task[];
+  metrics?: TaskMetrics;
 }
 
-const Metrics = ({ tasks }: Props) => {
-  const todo = tasks.filter((t) => t.status === "TODO").length;
-  const inProgress = tasks.filter((t) => t.status === "IN_PROGRESS").length;
-  const done = tasks.filter((t) => t.status === "DONE").length;
+const Metrics = ({ metrics }: Props) => {
+  const todo = metrics?.by_status.TODO ?? 0;
+  const inProgress = metrics?.by_status.IN_PROGRESS ?? 0;
+  const done = metrics?.by_status.DONE ?? 0;
+  const overdue = metrics?.overdue ?? 0;
 
   return (
     <div className="metrics">
@@ -23,6 +24,10 @@ const Metrics = ({ tasks }: Props) => {
         <p className="eyebrow">Completadas</p>
         <h3>{done}</h3>
       </div>
+      <div className="metric-card">
+        <p className="eyebrow">Vencidas</p>
+        <h3>{overdue}</h3>
+      </div>
     </div>
   );
 };
@@ -0,0 +1,41 @@
+import assert from "node:assert/strict";
+import { test } from "node:test";
+
+import type { AxiosInstance } from "axios";
+
+import { PAGE_SIZE, fetchAllPages } from "./pagination";
+
+function fakeClient(pages: Record<string, { data: number[]; headers: Record<string, string> }>) {
+  const calls: Record<string, unknown>[] = [];
+  const client = {
+    get: async (_url: string, config: { params: Record<string, unknown> }) => {
+      calls.push(config.params);
+      return pages[(config.params.cursor as string | undefined) ?? ""];
+    },
+  };
+  return { client: client as unknown as Pick<AxiosInstance, "get">, calls };
+}
+
+test("fetchAllPages follows X-Next-Cursor across pages", async () => {
+  const { client, calls } = fakeClient({
+    "": { data: [1, 2], headers: { "x-next-cursor": "page-2" } },
+    "page-2": { data: [3, 4], headers: { "x-next-cursor": "page-3" } },
+    "page-3": { data: [5], headers: {} },
+  });
+
+  const items = await fetchAllPages<number>(client, "/tasks", { project_id: 7 });
+
+  assert.deepEqual(items, [1, 2, 3, 4, 5]);
+  assert.deepEqual(
+    calls.map((params) => params.cursor),
+    [undefined, "page-2", "page-3"],
+  );
+  assert.ok(calls.every((params) => params.project_id === 7 && params.limit === PAGE_SIZE));
+});
+
+test("fetchAllPages stops after a single page without a cursor", async () => {
+  const { client, calls } = fakeClient({ "": { data: [1], headers: {} } });
+
+  assert.deepEqual(await fetchAllPages<number>(client, "/projects"), [1]);
+  assert.equal(calls.length, 1);
+});
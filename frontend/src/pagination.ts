@@ -0,0 +1,22 @@
+import type { AxiosInstance } from "axios";
+
+// The API's largest page (MAX_PAGE_SIZE), so a full list takes as few requests as possible.
+export const PAGE_SIZE = 500;
+
+/** Read every page of a keyset-paginated list, following `X-Next-Cursor` until it is absent. */
+export async function fetchAllPages<T>(
+  client: Pick<AxiosInstance, "get">,
+  url: string,
+  params: Record<string, unknown> = {},
+): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await client.get<T[]>(url, {
+      params: cursor ? { ...params, limit: PAGE_SIZE, cursor } : { ...params, limit: PAGE_SIZE },
+    });
+    items.push(...response.data);
+    cursor = (response.headers["x-next-cursor"] as string | undefined) || undefined;
+  } while (cursor);
+  return items;
+}
@@ -2,11 +2,13 @@ import { configureStore } from "@reduxjs/toolkit";
 import { useDispatch, useSelector } from "react-redux";
 import type { TypedUseSelectorHook } from "react-redux";
 
+import metricsReducer from "./metricsSlice";
 import projectsReducer from "./projectsSlice";
 import tasksReducer from "./tasksSlice";
 
 export const store = configureStore({
   reducer: {
+    metrics: metricsReducer,
     projects: projectsReducer,
     tasks: tasksReducer,
   },
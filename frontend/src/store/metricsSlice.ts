@@ -0,0 +1,43 @@
+import { createAsyncThunk, createSlice } from "@reduxjs/toolkit";
+import type { PayloadAction } from "@reduxjs/toolkit";
+
+import { api } from "../api";
+import type { TaskMetrics } from "../types";
+
+interface MetricsState {
+  current?: TaskMetrics;
+  status: "idle" | "loading" | "failed";
+  error?: string;
+}
+
+const initialState: MetricsState = {
+  status: "idle",
+};
+
+export const fetchMetrics = createAsyncThunk("metrics/fetch", async (projectId?: number) => {
+  const url = projectId ? `/projects/${projectId}/metrics` : "/metrics/tasks";
+  const { data } = await api.get<TaskMetrics>(url);
+  return data;
+});
+
+const metricsSlice = createSlice({
+  name: "metrics",
+  initialState,
+  reducers: {},
+  extraReducers: (builder) => {
+    builder
+      .addCase(fetchMetrics.pending, (state) => {
+        state.status = "loading";
+      })
+      .addCase(fetchMetrics.fulfilled, (state, action: PayloadAction<TaskMetrics>) => {
+        state.status = "idle";
+        state.current = action.payload;
+      })
+      .addCase(fetchMetrics.rejected, (state, action) => {
+        state.status = "failed";
+        state.error = action.error.message;
+      });
+  },
+});
+
+export default metricsSlice.reducer;
@@ -2,6 +2,7 @@ import { createAsyncThunk, createSlice } from "@reduxjs/toolkit";
 import type { PayloadAction } from "@reduxjs/toolkit";
 
 import { api } from "../api";
+import { fetchAllPages } from "../pagination";
 import type { Project } from "../types";
 
 export interface ProjectInput {
@@ -21,8 +22,7 @@ const initialState: ProjectsState = {
 };
 
 export const fetchProjects = createAsyncThunk("projects/fetch", async () => {
-  const { data } = await api.get<Project[]>("/projects");
-  return data;
+  return fetchAllPages<Project>(api, "/projects");
 });
 
 export const createProject = createAsyncThunk("projects/create", async (payload: ProjectInput) => {
@@ -2,6 +2,7 @@ import { createAsyncThunk, createSlice } from "@reduxjs/toolkit";
 import type { PayloadAction } from "@reduxjs/toolkit";
 
 import { api } from "../api";
+import { fetchAllPages } from "../pagination";
 import type { Task, TaskStatus } from "../types";
 
 export interface TaskInput {
@@ -26,8 +27,7 @@ const initialState: TasksState = {
 };
 
 export const fetchTasks = createAsyncThunk("tasks/fetch", async (projectId?: number) => {
-  const { data } = await api.get<Task[]>("/tasks", { params: projectId ? { project_id: projectId } : {} });
-  return data;
+  return fetchAllPages<Task>(api, "/tasks", projectId ? { project_id: projectId } : {});
 });
 
 export const createTask = createAsyncThunk("tasks/create", async (payload: TaskInput) => {
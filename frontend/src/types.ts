@@ -19,3 +19,10 @@ export interface Task {
   created_at?: string;
   updated_at?: string;
 }
+
+export interface TaskMetrics {
+  total: number;
+  by_status: Record<TaskStatus, number>;
+  by_priority: Record<string, number>;
+  overdue: number;
+}